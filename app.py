@@ -1,31 +1,125 @@
-from flask import Flask, request, jsonify, render_template, session, redirect, url_for
+from flask import Flask, Response, g, request, jsonify, render_template_string, session, redirect, url_for
 from flask_cors import CORS
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, date
+from calendar import monthrange
 import json
 import os
+import time
 import uuid
 import hashlib
+import itertools
 import secrets
+import threading
+
+from assets import AssetPipeline
+from coldstore import append_batch, read_archive, write_archive
+from metrics import MetricsRegistry
+from rwlock import ReadWriteLock
+from sessions import MemorySessionStore, SQLiteSessionStore, ServerSideSessionInterface
+from sharding import shard_for_user, user_id_for_email
+from snapshots import find_snapshot, list_snapshots, materialize, write_snapshot
 
 app = Flask(__name__)
 CORS(app)
 
-# Configure session
-app.config['SECRET_KEY'] = secrets.token_hex(32)
+# Request and storage metrics, exposed at /api/metrics
+metrics = MetricsRegistry()
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started"""
+    g.request_started = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    """Record latency, status and response size for the request"""
+    started = g.pop('request_started', None)
+    if started is not None:
+        metrics.observe_request(
+            request.endpoint or 'unmatched',
+            request.method,
+            response.status_code,
+            time.perf_counter() - started,
+            response.calculate_content_length() or 0
+        )
+    return response
 
 # In-memory storage (in production, use a proper database)
 tasks = []
 todos = []
 timer_sessions = []
 users = []
+# Users by id; users are only ever appended, so lookups don't need data_lock
+users_by_id = {}
+
+# Concurrency: views scan the collections under data_lock.read() and mutate
+# them under data_lock.write(). Records are copy-on-write: writers replace a
+# record with an updated copy instead of changing it in place, so a record a
+# reader already holds never changes underneath it.
+data_lock = ReadWriteLock()
+# Serializes writes to the data files
+save_lock = threading.Lock()
+# Each save_data() snapshot takes the next version under the read lock, so a
+# later version always holds later data; a snapshot older than the last one
+# written is stale and skipped
+save_versions = itertools.count(1)
+saved_version = 0
+# Guards the lazy builds of the archive and the day counters, and the start of the archival thread
+lazy_load_lock = threading.Lock()
+# Per-thread state for views running under write_locked
+write_state = threading.local()
+
+# Change tracking for incremental snapshots: each write bumps change_seq and
+# stamps it on the record id. Tracking restarts (with a new epoch) whenever
+# the data is reloaded, so an incremental snapshot needs a base from the same epoch.
+# Records are only stamped once a snapshot of the epoch has been taken, so a
+# server that never takes snapshots doesn't accumulate them.
+change_seq = 0
+change_epoch = uuid.uuid4().hex
+tracking_changes = False
+changed_records = {}
+deleted_records = {}
+last_snapshot = None
+snapshot_lock = threading.Lock()
+
+# Sharded deployments run one node per shard; each node only owns the users
+# that hash to its shard (see router.py)
+SHARD_COUNT = int(os.environ.get('TOODLESS_SHARD_COUNT', '1'))
+SHARD_INDEX = int(os.environ.get('TOODLESS_SHARD_INDEX', '0'))
+DATA_DIR = os.environ.get('TOODLESS_DATA_DIR', f'data/shard-{SHARD_INDEX}' if SHARD_COUNT > 1 else 'data')
 
 # Load data from JSON files if they exist
-TASKS_FILE = 'data/tasks.json'
-TODOS_FILE = 'data/todos.json'
-SESSIONS_FILE = 'data/sessions.json'
-USERS_FILE = 'data/users.json'
+TASKS_FILE = os.path.join(DATA_DIR, 'tasks.json')
+TODOS_FILE = os.path.join(DATA_DIR, 'todos.json')
+SESSIONS_FILE = os.path.join(DATA_DIR, 'sessions.json')
+USERS_FILE = os.path.join(DATA_DIR, 'users.json')
+ARCHIVE_FILE = os.path.join(DATA_DIR, 'archive.json.gz')
+SNAPSHOT_DIR = os.path.join(DATA_DIR, 'snapshots')
+ADMIN_TOKEN = os.environ.get('TOODLESS_ADMIN_TOKEN')
+
+# Archival policy: completed tasks/todos older than this many days are moved
+# out of the hot lists into the compressed archive (0 disables archival)
+ARCHIVE_AFTER_DAYS = int(os.environ.get('TOODLESS_ARCHIVE_AFTER_DAYS', '30'))
+ARCHIVE_INTERVAL_SECONDS = 3600
+
+# Cold store, loaded lazily on first use
+archive = None
+archived_task_counts = {}
+archival_thread = None
+
+# Per-user, per-day activity counters for the year summary, built lazily
+# on first use and then maintained incrementally by the write endpoints
+day_counters = None
+# Per-user recurring tasks by id, archived ones included, which the year
+# summary expands instead of counting per day; built and maintained the same way
+recurring_tasks = None
+
+def ensure_data_directory():
+    """Create the data directory if it doesn't exist"""
+    os.makedirs(DATA_DIR, exist_ok=True)
+
 # Ensure data directory and JSON files exist
-os.makedirs("data", exist_ok=True)
+ensure_data_directory()
 
 for file_path in [
     TASKS_FILE,
@@ -37,12 +131,74 @@ for file_path in [
         with open(file_path, "w") as f:
             json.dump([], f)
 
+# Configure session: the secret key is persisted so restarts and extra workers
+# agree on it, and session data is kept server-side with only an id in the cookie
+SECRET_KEY_FILE = os.path.join(DATA_DIR, 'secret_key')
+SESSION_DB_FILE = os.path.join(DATA_DIR, 'session_store.db')
+SESSION_STORE = os.environ.get('TOODLESS_SESSION_STORE', 'sqlite')
+SESSION_TTL_SECONDS = int(os.environ.get('TOODLESS_SESSION_TTL', str(7 * 24 * 3600)))
 
+def load_secret_key():
+    """Get the secret key from the environment, or from a key file created on first start"""
+    if os.environ.get('TOODLESS_SECRET_KEY'):
+        return os.environ['TOODLESS_SECRET_KEY']
+    
+    if not os.path.exists(SECRET_KEY_FILE):
+        # Link a fully written temp file into place so concurrent workers agree on one key
+        temp_path = f"{SECRET_KEY_FILE}.{os.getpid()}.tmp"
+        with open(temp_path, 'w') as f:
+            f.write(secrets.token_hex(32))
+        os.chmod(temp_path, 0o600)
+        try:
+            os.link(temp_path, SECRET_KEY_FILE)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(temp_path)
+    
+    with open(SECRET_KEY_FILE) as f:
+        return f.read().strip()
+
+app.config['SECRET_KEY'] = load_secret_key()
+if SESSION_STORE == 'memory':
+    session_store = MemorySessionStore()
+else:
+    session_store = SQLiteSessionStore(SESSION_DB_FILE)
+app.session_interface = ServerSideSessionInterface(session_store, SESSION_TTL_SECONDS)
+
+# Frontend pages have nothing request-specific in them, so they are rendered,
+# fingerprinted and compressed once at startup instead of on every request
+PAGES_DIR = os.path.dirname(os.path.abspath(__file__))
+PAGE_FILES = ['index.html', 'login.html', 'signup.html']
+assets = AssetPipeline()
+
+def build_pages():
+    """Render the frontend pages once and register them with the asset pipeline"""
+    with app.test_request_context():
+        for name in PAGE_FILES:
+            try:
+                with open(os.path.join(PAGES_DIR, name), encoding='utf-8') as f:
+                    assets.add_page(name, render_template_string(f.read()))
+            except Exception as e:
+                print(f"Error building page {name}: {e}")
+
+build_pages()
 
+@metrics.timed('load_data')
 def load_data():
     """Load tasks, todos, sessions, and users from files"""
-    global tasks, todos, timer_sessions, users
+    with data_lock.write():
+        load_data_files()
+
+def load_data_files():
+    """Read the data files into memory (caller holds the write lock)"""
+    global tasks, todos, timer_sessions, users, users_by_id, archive, day_counters, recurring_tasks
     
+    # Archive, day counters and the recurring task index are rebuilt lazily on first use
+    archive = None
+    day_counters = None
+    recurring_tasks = None
+    reset_change_tracking()
     
     try:
         if os.path.exists(TASKS_FILE):
@@ -75,34 +231,508 @@ def load_data():
     except Exception as e:
         print(f"Error loading users: {e}")
         users = []
+    
+    users_by_id = {u['id']: u for u in users}
 
+@metrics.timed('save_data')
 def save_data():
-    """Save tasks, todos, sessions, and users to files"""
-    ensure_data_directory()
-    
+    """Save tasks, todos, sessions, and users to files
+    
+    Copying the lists is enough for a consistent snapshot because records are
+    never modified in place. Inside a write_locked view the save is deferred
+    until the view has released the lock. Savers can reach save_lock out of
+    order, so a snapshot is only written if it is newer than the last one.
+    """
+    global saved_version
+    if getattr(write_state, 'active', False):
+        write_state.save_requested = True
+        return
+    
+    with data_lock.read():
+        version = next(save_versions)
+        snapshot = [
+            (TASKS_FILE, list(tasks), 'tasks'),
+            (TODOS_FILE, list(todos), 'todos'),
+            (SESSIONS_FILE, list(timer_sessions), 'sessions'),
+            (USERS_FILE, list(users), 'users')
+        ]
+    
+    with save_lock:
+        if version < saved_version:
+            return
+        saved_version = version
+        ensure_data_directory()
+        for file_path, records, name in snapshot:
+            try:
+                write_json_file(file_path, records)
+            except Exception as e:
+                print(f"Error saving {name}: {e}")
+
+def write_json_file(file_path, data):
+    """Write JSON to a temporary file and swap it in, so readers never see a partial file"""
+    temp_path = f"{file_path}.tmp"
+    with open(temp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(temp_path, file_path)
+
+# Archival helper functions
+@metrics.timed('load_archive')
+def load_archive():
+    """Load archived tasks and todos from the compressed cold store"""
+    global archive, archived_task_counts
+    if archive is not None:
+        return archive
+    
+    with lazy_load_lock:
+        if archive is not None:
+            return archive
+        
+        store = {'tasks': [], 'todos': []}
+        try:
+            store = read_archive(ARCHIVE_FILE)
+        except Exception as e:
+            print(f"Error loading archive: {e}")
+        
+        archived_task_counts = count_archived_tasks(store)
+        archive = store
+    return archive
+
+def count_archived_tasks(store):
+    """Count archived tasks per user"""
+    counts = {}
+    for task in store['tasks']:
+        user_id = task.get('user_id')
+        counts[user_id] = counts.get(user_id, 0) + 1
+    return counts
+
+@metrics.timed('save_archive')
+def save_archive():
+    """Rewrite the whole archive file from memory
+    
+    The read lock is held until the file is written, so no batch can be
+    appended in between and then lost by the rewrite.
+    """
+    with data_lock.read(), save_lock:
+        ensure_data_directory()
+        try:
+            write_archive(ARCHIVE_FILE, archive)
+        except Exception as e:
+            print(f"Error saving archive: {e}")
+
+@metrics.timed('append_archive')
+def append_archive(batch):
+    """Append a batch of archived or removed records to the archive file (caller holds the write lock)"""
+    with save_lock:
+        ensure_data_directory()
+        append_batch(ARCHIVE_FILE, batch)
+
+def is_archivable(item, cutoff):
+    """Check if an item was completed before the cutoff"""
+    if not item.get('completed') or not item.get('completed_at'):
+        return False
     try:
-        with open(TASKS_FILE, 'w') as f:
-            json.dump(tasks, f, indent=2)
-    except Exception as e:
-        print(f"Error saving tasks: {e}")
+        return datetime.fromisoformat(item['completed_at']) < cutoff
+    except (TypeError, ValueError):
+        return False
+
+def archive_completed():
+    """Move old completed tasks and todos from the hot lists into the archive
+    
+    Only the new batch is appended to the archive file; the archive isn't
+    loaded into memory for this.
+    """
+    if ARCHIVE_AFTER_DAYS <= 0:
+        return 0
+    
+    cutoff = datetime.now() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    # Check under the read lock first so an idle run doesn't hold off readers
+    with data_lock.read():
+        if not any(is_archivable(t, cutoff) for t in tasks) and not any(is_archivable(t, cutoff) for t in todos):
+            return 0
+    
+    with data_lock.write():
+        old_tasks = [t for t in tasks if is_archivable(t, cutoff)]
+        old_todos = [t for t in todos if is_archivable(t, cutoff)]
+        if not old_tasks and not old_todos:
+            return 0
+        
+        # The batch is on disk before it leaves the hot lists, and a concurrent
+        # lazy load of the archive either sees it in the file or in memory
+        with lazy_load_lock:
+            append_archive({'tasks': old_tasks, 'todos': old_todos})
+            if archive is not None:
+                archive['tasks'].extend(old_tasks)
+                archive['todos'].extend(old_todos)
+                for task in old_tasks:
+                    user_id = task.get('user_id')
+                    archived_task_counts[user_id] = archived_task_counts.get(user_id, 0) + 1
+        
+        for task in old_tasks:
+            track_change('tasks', task['id'], deleted=True)
+            track_change('archived_tasks', task['id'])
+        for todo in old_todos:
+            track_change('todos', todo['id'], deleted=True)
+            track_change('archived_todos', todo['id'])
+        
+        # Update the hot lists in place so existing references stay valid
+        archived_ids = {r['id'] for r in old_tasks + old_todos}
+        tasks[:] = [t for t in tasks if t['id'] not in archived_ids]
+        todos[:] = [t for t in todos if t['id'] not in archived_ids]
     
-    try:
-        with open(TODOS_FILE, 'w') as f:
-            json.dump(todos, f, indent=2)
-    except Exception as e:
-        print(f"Error saving todos: {e}")
+    save_data()
+    return len(old_tasks) + len(old_todos)
+
+def archival_loop():
+    """Run the archival policy in the background every ARCHIVE_INTERVAL_SECONDS"""
+    while True:
+        try:
+            archive_completed()
+        except Exception as e:
+            print(f"Error archiving: {e}")
+        time.sleep(ARCHIVE_INTERVAL_SECONDS)
+
+def find_archived(collection, record_id, user_id):
+    """Find a user's archived task or todo, or None"""
+    return next((r for r in load_archive()[collection] if r['id'] == record_id and r.get('user_id') == user_id), None)
+
+def unarchive(collection, record_id, user_id):
+    """Move a user's archived task or todo back into its hot list (caller holds the write lock)
+    
+    Returns the record's index in the hot list, or None if the user has no
+    such archived record.
+    """
+    records = load_archive()[collection]
+    index = next((i for i, r in enumerate(records) if r['id'] == record_id and r.get('user_id') == user_id), None)
+    if index is None:
+        return None
+    
+    append_archive({'removed': {collection: [record_id]}})
+    record = records.pop(index)
+    if collection == 'tasks':
+        archived_task_counts[user_id] -= 1
+    track_change(f'archived_{collection}', record_id, deleted=True)
+    
+    hot_records = tasks if collection == 'tasks' else todos
+    hot_records.append(record)
+    track_change(collection, record_id)
+    return len(hot_records) - 1
+
+def include_archived_requested():
+    """Check if the request asks for archived items too"""
+    return request.args.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+# Snapshot helper functions
+def track_change(collection, record_id, deleted=False):
+    """Record a write for incremental snapshots (caller holds the write lock)"""
+    global change_seq
+    change_seq += 1
+    if not tracking_changes:
+        return
+    if deleted:
+        changed_records.get(collection, {}).pop(record_id, None)
+        deleted_records.setdefault(collection, {})[record_id] = change_seq
+    else:
+        deleted_records.get(collection, {}).pop(record_id, None)
+        changed_records.setdefault(collection, {})[record_id] = change_seq
+
+def reset_change_tracking():
+    """Start change tracking over in a new epoch (caller holds the write lock)"""
+    global change_epoch, last_snapshot, tracking_changes
+    change_epoch = uuid.uuid4().hex
+    tracking_changes = False
+    changed_records.clear()
+    deleted_records.clear()
+    last_snapshot = None
+
+def create_snapshot(incremental=False):
+    """Snapshot all collections while writes carry on
+    
+    Writers are only held off while the lists are copied; since records are
+    copy-on-write the copies are a consistent point-in-time view. An
+    incremental snapshot falls back to a full one when there is no base
+    snapshot from the current tracking epoch.
+    """
+    global last_snapshot, tracking_changes
+    store = load_archive()
+    with snapshot_lock:
+        base = last_snapshot if incremental and last_snapshot and last_snapshot['epoch'] == change_epoch else None
+        with data_lock.read():
+            seq, epoch = change_seq, change_epoch
+            # Writers are held off, so every change after this copy is tracked
+            tracking_changes = True
+            current = {
+                'tasks': list(tasks),
+                'todos': list(todos),
+                'timer_sessions': list(timer_sessions),
+                'users': list(users),
+                'archived_tasks': list(store['tasks']),
+                'archived_todos': list(store['todos'])
+            }
+            if base:
+                changed = {name: {i for i, s in ids.items() if s > base['seq']} for name, ids in changed_records.items()}
+                deleted = {name: [i for i, s in ids.items() if s > base['seq']] for name, ids in deleted_records.items()}
+        
+        now = datetime.now()
+        snapshot = {
+            'id': now.strftime('%Y%m%dT%H%M%S%f') + ('-incremental' if base else '-full'),
+            'type': 'incremental' if base else 'full',
+            'base': base['id'] if base else None,
+            'created_at': now.isoformat(),
+            'seq': seq,
+            'epoch': epoch
+        }
+        if base:
+            snapshot['upserts'] = {name: [r for r in records if r['id'] in changed.get(name, ())]
+                                   for name, records in current.items()}
+            snapshot['deletes'] = {name: ids for name, ids in deleted.items() if ids}
+        else:
+            snapshot['collections'] = current
+        
+        meta = write_snapshot(SNAPSHOT_DIR, snapshot)
+        last_snapshot = meta
+    
+    # Changes up to this snapshot are captured, so stop tracking them
+    with data_lock.write():
+        if change_epoch == epoch:
+            for tracked in (changed_records, deleted_records):
+                for ids in tracked.values():
+                    for record_id in [i for i, s in ids.items() if s <= seq]:
+                        del ids[record_id]
+    return meta
+
+def restore_snapshot(snapshot_id=None, at=None):
+    """Restore all collections from a snapshot, by id or the latest taken at or before a timestamp
+    
+    Raises ValueError if the timestamp can't be parsed.
+    """
+    global archive, archived_task_counts, users_by_id, day_counters, recurring_tasks
+    meta = find_snapshot(SNAPSHOT_DIR, snapshot_id, at)
+    if meta is None:
+        return None
+    
+    collections = materialize(SNAPSHOT_DIR, meta['id'])
+    with data_lock.write():
+        tasks[:] = collections.get('tasks', [])
+        todos[:] = collections.get('todos', [])
+        timer_sessions[:] = collections.get('timer_sessions', [])
+        users[:] = collections.get('users', [])
+        users_by_id = {u['id']: u for u in users}
+        archive = {'tasks': collections.get('archived_tasks', []), 'todos': collections.get('archived_todos', [])}
+        archived_task_counts = count_archived_tasks(archive)
+        day_counters = None
+        recurring_tasks = None
+        reset_change_tracking()
+    
+    save_data()
+    save_archive()
+    return meta
+
+# Recurrence helper functions
+RECURRENCE_FREQUENCIES = ('daily', 'weekly', 'monthly')
+
+def parse_recurrence(rule):
+    """Validate a recurrence rule and return it in normalised form"""
+    if not rule:
+        return None
+    if not isinstance(rule, dict) or rule.get('freq') not in RECURRENCE_FREQUENCIES:
+        raise ValueError('Recurrence freq must be daily, weekly or monthly')
     
     try:
-        with open(SESSIONS_FILE, 'w') as f:
-            json.dump(timer_sessions, f, indent=2)
-    except Exception as e:
-        print(f"Error saving sessions: {e}")
+        interval = int(rule.get('interval', 1))
+        count = int(rule['count']) if rule.get('count') is not None else None
+        until = date.fromisoformat(rule['until'][:10]).isoformat() if rule.get('until') else None
+        exceptions = sorted({date.fromisoformat(d[:10]).isoformat() for d in rule.get('exceptions', [])})
+    except (TypeError, ValueError, AttributeError):
+        raise ValueError('Invalid recurrence rule')
+    
+    if interval < 1 or (count is not None and count < 1):
+        raise ValueError('Recurrence interval and count must be positive')
+    
+    return {
+        'freq': rule['freq'],
+        'interval': interval,
+        'count': count,
+        'until': until,
+        'exceptions': exceptions
+    }
+
+def iter_occurrence_dates(rule, start, range_start, range_end):
+    """Yield the dates of a recurrence rule that fall within a date range"""
+    if rule.get('until'):
+        range_end = min(range_end, date.fromisoformat(rule['until']))
+    range_start = max(range_start, start)
+    if range_start > range_end:
+        return
+    
+    count = rule.get('count')
+    interval = rule['interval']
+    exceptions = set(rule.get('exceptions', []))
+    
+    if rule['freq'] == 'monthly':
+        # Months without the start day (e.g. the 31st) are skipped and don't
+        # use up the count, so with a count the months are walked from the
+        # start; without one, jump straight to the first month in range
+        if count is None:
+            n = ((range_start.year - start.year) * 12 + range_start.month - start.month) // interval
+        else:
+            n = 0
+        generated = 0
+        while count is None or generated < count:
+            months = start.month - 1 + n * interval
+            year, month = start.year + months // 12, months % 12 + 1
+            if date(year, month, 1) > range_end:
+                break
+            if start.day <= monthrange(year, month)[1]:
+                generated += 1
+                day = date(year, month, start.day)
+                if range_start <= day <= range_end and day.isoformat() not in exceptions:
+                    yield day
+            n += 1
+    else:
+        step = interval * (7 if rule['freq'] == 'weekly' else 1)
+        # Jump straight to the first occurrence on or after range_start
+        n = -(-(range_start - start).days // step)
+        while count is None or n < count:
+            day = start + timedelta(days=n * step)
+            if day > range_end:
+                break
+            if day.isoformat() not in exceptions:
+                yield day
+            n += 1
+
+def expand_occurrences(task, range_start, range_end):
+    """Expand a recurring task into occurrence records within a date range"""
+    try:
+        start = date.fromisoformat(task['due_date'][:10])
+    except (KeyError, TypeError, ValueError):
+        return []
+    
+    time_suffix = task['due_date'][10:]
+    overrides = task.get('occurrence_overrides', {})
+    occurrences = []
+    for day in iter_occurrence_dates(task['recurrence'], start, range_start, range_end):
+        occurrence = {k: v for k, v in task.items() if k != 'occurrence_overrides'}
+        occurrence['due_date'] = day.isoformat() + time_suffix
+        occurrence['occurrence_date'] = day.isoformat()
+        override = overrides.get(day.isoformat(), {})
+        occurrence['completed'] = override.get('completed', False)
+        occurrence['completed_at'] = override.get('completed_at')
+        occurrences.append(occurrence)
+    return occurrences
+
+def date_range_for_prefix(prefix):
+    """Turn a YYYY, YYYY-MM or YYYY-MM-DD filter into a (start, end) date range"""
+    try:
+        if len(prefix) == 10:
+            day = date.fromisoformat(prefix)
+            return day, day
+        if len(prefix) == 7:
+            year, month = int(prefix[:4]), int(prefix[5:7])
+            return date(year, month, 1), date(year, month, monthrange(year, month)[1])
+        if len(prefix) == 4:
+            year = int(prefix)
+            return date(year, 1, 1), date(year, 12, 31)
+    except ValueError:
+        pass
+    return None
+
+# Day counter helper functions
+def day_count_contribution(kind, record):
+    """Return the (day, counter, amount) a record adds to the day counters"""
+    if kind == 'task':
+        if record.get('recurrence'):
+            return None
+        day, counter, amount = record.get('due_date'), 'tasks', 1
+    elif kind == 'todo':
+        if not record.get('completed'):
+            return None
+        day, counter, amount = record.get('date'), 'completed_todos', 1
+    else:
+        if record.get('type') != 'focus' or not record.get('completed'):
+            return None
+        day, counter = record.get('started_at'), 'focus_minutes'
+        amount = record.get('actual_duration_minutes', record.get('duration_minutes', 0)) or 0
     
     try:
-        with open(USERS_FILE, 'w') as f:
-            json.dump(users, f, indent=2)
-    except Exception as e:
-        print(f"Error saving users: {e}")
+        return date.fromisoformat(day[:10]).isoformat(), counter, amount
+    except (TypeError, ValueError):
+        return None
+
+def adjust_day_counters(kind, record, sign, counters=None):
+    """Add (sign=1) or remove (sign=-1) a record's contribution to the day counters"""
+    if counters is None:
+        counters = day_counters
+    if counters is None:
+        return
+    contribution = day_count_contribution(kind, record)
+    if contribution is None:
+        return
+    
+    day, counter, amount = contribution
+    year_counts = counters.setdefault(record.get('user_id'), {}).setdefault(int(day[:4]), {})
+    counts = year_counts.setdefault(day, {'tasks': 0, 'completed_todos': 0, 'focus_minutes': 0})
+    counts[counter] += sign * amount
+    if not any(counts.values()):
+        del year_counts[day]
+
+def index_recurring_task(task, add):
+    """Add (add=True) or remove (add=False) a task in the recurring task index"""
+    if recurring_tasks is None:
+        return
+    user_tasks = recurring_tasks.setdefault(task.get('user_id'), {})
+    if add and task.get('recurrence'):
+        user_tasks[task['id']] = task
+    else:
+        user_tasks.pop(task['id'], None)
+
+def get_recurring_tasks(user_id):
+    """Return a user's recurring tasks, building the index from all tasks on first use"""
+    global recurring_tasks
+    if recurring_tasks is None:
+        # Callers hold the read lock, so the task lists can't change while we build
+        store = load_archive()
+        with lazy_load_lock:
+            if recurring_tasks is None:
+                index = {}
+                for task in tasks + store['tasks']:
+                    if task.get('recurrence'):
+                        index.setdefault(task.get('user_id'), {})[task['id']] = task
+                recurring_tasks = index
+    return list(recurring_tasks.get(user_id, {}).values())
+
+def get_day_counters():
+    """Return the day counters, building them from all records on first use"""
+    global day_counters
+    if day_counters is not None:
+        return day_counters
+    
+    # Callers hold the read lock, so the collections can't change while we build
+    store = load_archive()
+    with lazy_load_lock:
+        if day_counters is None:
+            counters = {}
+            for task in tasks + store['tasks']:
+                adjust_day_counters('task', task, 1, counters)
+            for todo in todos + store['todos']:
+                adjust_day_counters('todo', todo, 1, counters)
+            for timer_session in timer_sessions:
+                adjust_day_counters('session', timer_session, 1, counters)
+            day_counters = counters
+    return day_counters
+
+@app.before_request
+def start_archival_thread():
+    """Start the background archival thread in this process if it isn't running"""
+    global archival_thread
+    if ARCHIVE_AFTER_DAYS <= 0 or (archival_thread is not None and archival_thread.is_alive()):
+        return
+    
+    # Checked per request rather than started on import, so worker processes
+    # forked from a preloaded app start their own thread
+    with lazy_load_lock:
+        if archival_thread is None or not archival_thread.is_alive():
+            archival_thread = threading.Thread(target=archival_loop, name='toodless-archival', daemon=True)
+            archival_thread.start()
 
 # Authentication helper functions
 def hash_password(password):
@@ -121,23 +751,66 @@ def get_current_user():
     """Get current user from session"""
     if not is_authenticated():
         return None
-    user_id = session['user_id']
-    return next((u for u in users if u['id'] == user_id), None)
+    return users_by_id.get(session['user_id'])
+
+def read_locked(f):
+    """Decorator to run a view while holding the data lock for reading"""
+    def decorated_function(*args, **kwargs):
+        with data_lock.read():
+            return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+def write_locked(f):
+    """Decorator to run a view while holding the data lock for writing"""
+    def decorated_function(*args, **kwargs):
+        write_state.save_requested = False
+        with data_lock.write():
+            write_state.active = True
+            try:
+                result = f(*args, **kwargs)
+            finally:
+                write_state.active = False
+        # Persist after releasing the lock so readers aren't blocked on disk I/O
+        if write_state.save_requested:
+            save_data()
+        return result
+    decorated_function.__name__ = f.__name__
+    return decorated_function
 
 def require_auth(f):
     """Decorator to require authentication"""
     def decorated_function(*args, **kwargs):
-        if not is_authenticated():
+        # A session for a user this node doesn't hold (e.g. another shard's) is not valid here
+        if not is_authenticated() or get_current_user() is None:
             return jsonify({'success': False, 'error': 'Authentication required'}), 401
         return f(*args, **kwargs)
     decorated_function.__name__ = f.__name__
     return decorated_function
 
+def require_admin(f):
+    """Decorator to require the admin token"""
+    def decorated_function(*args, **kwargs):
+        if not ADMIN_TOKEN:
+            return jsonify({'success': False, 'error': 'Admin API is disabled'}), 403
+        if not secrets.compare_digest(request.headers.get('X-Admin-Token', ''), ADMIN_TOKEN):
+            return jsonify({'success': False, 'error': 'Admin token required'}), 401
+        return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
 @app.route("/")
 def index():
-    return "FLASK IS WORKING"
-
+    """Serve the main app page"""
+    return assets.page_response('index.html', request)
 
+@app.route('/static/build/<path:filename>')
+def asset_file(filename):
+    """Serve a fingerprinted CSS/JS asset extracted from the pages"""
+    response = assets.asset_response(filename, request)
+    if response is None:
+        return jsonify({'success': False, 'error': 'Asset not found'}), 404
+    return response
 
 # Authentication Routes
 
@@ -146,16 +819,17 @@ def login():
     """Serve login page"""
     if is_authenticated():
         return redirect(url_for('index'))
-    return render_template('login.html')
+    return assets.page_response('login.html', request)
 
 @app.route('/signup')
 def signup():
     """Serve signup page"""
     if is_authenticated():
         return redirect(url_for('index'))
-    return render_template('signup.html')
+    return assets.page_response('signup.html', request)
 
 @app.route('/api/auth/login', methods=['POST'])
+@read_locked
 def api_login():
     """Handle user login"""
     data = request.get_json()
@@ -173,6 +847,7 @@ def api_login():
         return jsonify({'success': False, 'error': 'Invalid email or password'}), 401
     
     # Set session
+    session.rotate()
     session['user_id'] = user['id']
     session['user_email'] = user['email']
     session['user_name'] = user['name']
@@ -188,6 +863,7 @@ def api_login():
     })
 
 @app.route('/api/auth/signup', methods=['POST'])
+@write_locked
 def api_signup():
     """Handle user registration"""
     data = request.get_json()
@@ -209,13 +885,18 @@ def api_signup():
     if '@' not in email:
         return jsonify({'success': False, 'error': 'Invalid email format'}), 400
     
+    # User ids are derived from the email so the router can place users by id
+    user_id = user_id_for_email(email)
+    if shard_for_user(user_id, SHARD_COUNT) != SHARD_INDEX:
+        return jsonify({'success': False, 'error': 'User belongs to another shard'}), 421
+    
     # Check if user already exists
     if any(u['email'].lower() == email for u in users):
         return jsonify({'success': False, 'error': 'Email already registered'}), 409
     
     # Create new user
     user = {
-        'id': str(uuid.uuid4()),
+        'id': user_id,
         'name': name,
         'email': email,
         'password_hash': hash_password(password),
@@ -224,9 +905,12 @@ def api_signup():
     }
     
     users.append(user)
+    track_change('users', user['id'])
+    users_by_id[user['id']] = user
     save_data()
     
     # Set session
+    session.rotate()
     session['user_id'] = user['id']
     session['user_email'] = user['email']
     session['user_name'] = user['name']
@@ -251,6 +935,7 @@ def api_logout():
     })
 
 @app.route('/api/auth/me')
+@read_locked
 def api_get_current_user():
     """Get current user info"""
     if not is_authenticated():
@@ -274,6 +959,7 @@ def api_get_current_user():
 
 @app.route('/api/tasks', methods=['GET'])
 @require_auth
+@read_locked
 def get_tasks():
     """Get all tasks or filter by date"""
     current_user = get_current_user()
@@ -283,10 +969,21 @@ def get_tasks():
     
     # Filter tasks by current user
     user_tasks = [t for t in tasks if t.get('user_id') == current_user['id']]
+    if include_archived_requested():
+        user_tasks += [t for t in load_archive()['tasks'] if t.get('user_id') == current_user['id']]
     filtered_tasks = user_tasks.copy()
     
     if date_filter:
-        filtered_tasks = [t for t in filtered_tasks if t.get('due_date', '').startswith(date_filter)]
+        # Recurring tasks are expanded lazily, only for the requested range
+        date_range = date_range_for_prefix(date_filter)
+        occurrences = []
+        if date_range:
+            for task in filtered_tasks:
+                if task.get('recurrence'):
+                    occurrences.extend(expand_occurrences(task, *date_range))
+        filtered_tasks = [t for t in filtered_tasks
+                          if not t.get('recurrence') and (t.get('due_date') or '').startswith(date_filter)]
+        filtered_tasks += occurrences
     
     if project_filter:
         filtered_tasks = [t for t in filtered_tasks if t.get('project') == project_filter]
@@ -303,6 +1000,7 @@ def get_tasks():
 
 @app.route('/api/tasks', methods=['POST'])
 @require_auth
+@write_locked
 def create_task():
     """Create a new task"""
     data = request.get_json()
@@ -310,6 +1008,14 @@ def create_task():
     if not data or not data.get('title'):
         return jsonify({'success': False, 'error': 'Task title is required'}), 400
     
+    try:
+        recurrence = parse_recurrence(data.get('recurrence'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    
+    if recurrence and not data.get('due_date'):
+        return jsonify({'success': False, 'error': 'Recurring tasks require a due_date'}), 400
+    
     current_user = get_current_user()
     task = {
         'id': str(uuid.uuid4()),
@@ -326,10 +1032,15 @@ def create_task():
         'created_at': datetime.now().isoformat(),
         'updated_at': datetime.now().isoformat(),
         'completed': False,
-        'completed_at': None
+        'completed_at': None,
+        'recurrence': recurrence,
+        'occurrence_overrides': {}
     }
     
     tasks.append(task)
+    track_change('tasks', task['id'])
+    adjust_day_counters('task', task, 1)
+    index_recurring_task(task, True)
     save_data()
     
     return jsonify({
@@ -340,6 +1051,7 @@ def create_task():
 
 @app.route('/api/tasks/<task_id>', methods=['PUT'])
 @require_auth
+@write_locked
 def update_task(task_id):
     """Update an existing task"""
     data = request.get_json()
@@ -347,13 +1059,33 @@ def update_task(task_id):
     
     task_index = next((i for i, t in enumerate(tasks) if t['id'] == task_id), None)
     if task_index is None:
+        current_task = find_archived('tasks', task_id, current_user['id'])
+    else:
+        current_task = tasks[task_index]
+    if current_task is None:
         return jsonify({'success': False, 'error': 'Task not found'}), 404
     
     # Check if user owns this task
-    if tasks[task_index].get('user_id') != current_user['id']:
+    if current_task.get('user_id') != current_user['id']:
         return jsonify({'success': False, 'error': 'Access denied'}), 403
     
-    task = tasks[task_index]
+    if 'recurrence' in data:
+        try:
+            recurrence = parse_recurrence(data['recurrence'])
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        if recurrence and not data.get('due_date', current_task.get('due_date')):
+            return jsonify({'success': False, 'error': 'Recurring tasks require a due_date'}), 400
+    
+    # Archived tasks move back into the active list once the update is valid
+    if task_index is None:
+        task_index = unarchive('tasks', task_id, current_user['id'])
+    task = dict(tasks[task_index])
+    
+    adjust_day_counters('task', tasks[task_index], -1)
+    index_recurring_task(tasks[task_index], False)
+    if 'recurrence' in data:
+        task['recurrence'] = recurrence
     
     # Update fields
     updatable_fields = ['title', 'description', 'project', 'priority', 'status', 
@@ -364,12 +1096,17 @@ def update_task(task_id):
             task[field] = data[field]
     
     # Handle completion
-    if data.get('completed') and not task.get('completed_at'):
-        task['completed_at'] = datetime.now().isoformat()
-    elif not data.get('completed'):
-        task['completed_at'] = None
+    if 'completed' in data:
+        if data['completed'] and not task.get('completed_at'):
+            task['completed_at'] = datetime.now().isoformat()
+        elif not data['completed']:
+            task['completed_at'] = None
     
     task['updated_at'] = datetime.now().isoformat()
+    tasks[task_index] = task
+    track_change('tasks', task['id'])
+    adjust_day_counters('task', task, 1)
+    index_recurring_task(task, True)
     save_data()
     
     return jsonify({
@@ -380,12 +1117,16 @@ def update_task(task_id):
 
 @app.route('/api/tasks/<task_id>', methods=['DELETE'])
 @require_auth
+@write_locked
 def delete_task(task_id):
     """Delete a task"""
     global tasks
     current_user = get_current_user()
     
     task_index = next((i for i, t in enumerate(tasks) if t['id'] == task_id), None)
+    if task_index is None:
+        # Archived tasks move back into the active list when changed
+        task_index = unarchive('tasks', task_id, current_user['id'])
     if task_index is None:
         return jsonify({'success': False, 'error': 'Task not found'}), 404
     
@@ -394,6 +1135,9 @@ def delete_task(task_id):
         return jsonify({'success': False, 'error': 'Access denied'}), 403
     
     deleted_task = tasks.pop(task_index)
+    track_change('tasks', deleted_task['id'], deleted=True)
+    adjust_day_counters('task', deleted_task, -1)
+    index_recurring_task(deleted_task, False)
     save_data()
     
     return jsonify({
@@ -402,10 +1146,87 @@ def delete_task(task_id):
         'deleted_task': deleted_task
     })
 
+@app.route('/api/tasks/<task_id>/occurrences/<occurrence_date>', methods=['PUT'])
+@require_auth
+@write_locked
+def update_task_occurrence(task_id, occurrence_date):
+    """Mark a single occurrence of a recurring task as completed or not"""
+    data = request.get_json() or {}
+    current_user = get_current_user()
+    
+    task_index = next((i for i, t in enumerate(tasks) if t['id'] == task_id), None)
+    if task_index is None:
+        return jsonify({'success': False, 'error': 'Task not found'}), 404
+    
+    task = dict(tasks[task_index])
+    
+    if task.get('user_id') != current_user['id']:
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    date_range = date_range_for_prefix(occurrence_date) if len(occurrence_date) == 10 else None
+    occurrences = expand_occurrences(task, *date_range) if task.get('recurrence') and date_range else []
+    if not occurrences:
+        return jsonify({'success': False, 'error': 'Occurrence not found'}), 404
+    
+    overrides = dict(task.get('occurrence_overrides', {}))
+    if data.get('completed'):
+        overrides[occurrence_date] = {'completed': True, 'completed_at': datetime.now().isoformat()}
+    else:
+        overrides.pop(occurrence_date, None)
+    
+    task['occurrence_overrides'] = overrides
+    task['updated_at'] = datetime.now().isoformat()
+    tasks[task_index] = task
+    track_change('tasks', task['id'])
+    index_recurring_task(task, True)
+    save_data()
+    
+    return jsonify({
+        'success': True,
+        'occurrence': expand_occurrences(task, *date_range)[0],
+        'message': 'Occurrence updated successfully'
+    })
+
+@app.route('/api/tasks/<task_id>/occurrences/<occurrence_date>', methods=['DELETE'])
+@require_auth
+@write_locked
+def skip_task_occurrence(task_id, occurrence_date):
+    """Skip a single occurrence of a recurring task by adding an exception"""
+    current_user = get_current_user()
+    
+    task_index = next((i for i, t in enumerate(tasks) if t['id'] == task_id), None)
+    if task_index is None:
+        return jsonify({'success': False, 'error': 'Task not found'}), 404
+    
+    task = dict(tasks[task_index])
+    
+    if task.get('user_id') != current_user['id']:
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    date_range = date_range_for_prefix(occurrence_date) if len(occurrence_date) == 10 else None
+    if not task.get('recurrence') or not date_range or not expand_occurrences(task, *date_range):
+        return jsonify({'success': False, 'error': 'Occurrence not found'}), 404
+    
+    exceptions = sorted(set(task['recurrence']['exceptions']) | {occurrence_date})
+    task['recurrence'] = dict(task['recurrence'], exceptions=exceptions)
+    task['occurrence_overrides'] = {day: override for day, override in task.get('occurrence_overrides', {}).items()
+                                    if day != occurrence_date}
+    task['updated_at'] = datetime.now().isoformat()
+    tasks[task_index] = task
+    track_change('tasks', task['id'])
+    index_recurring_task(task, True)
+    save_data()
+    
+    return jsonify({
+        'success': True,
+        'message': 'Occurrence skipped successfully'
+    })
+
 # Todo Management API Endpoints
 
 @app.route('/api/todos', methods=['GET'])
 @require_auth
+@read_locked
 def get_todos():
     """Get all todos or filter by date"""
     current_user = get_current_user()
@@ -413,6 +1234,8 @@ def get_todos():
     
     # Filter todos by current user
     user_todos = [t for t in todos if t.get('user_id') == current_user['id']]
+    if include_archived_requested():
+        user_todos += [t for t in load_archive()['todos'] if t.get('user_id') == current_user['id']]
     filtered_todos = user_todos.copy()
     
     if date_filter:
@@ -427,6 +1250,7 @@ def get_todos():
 
 @app.route('/api/todos', methods=['POST'])
 @require_auth
+@write_locked
 def create_todo():
     """Create a new todo"""
     data = request.get_json()
@@ -447,6 +1271,8 @@ def create_todo():
     }
     
     todos.append(todo)
+    track_change('todos', todo['id'])
+    adjust_day_counters('todo', todo, 1)
     save_data()
     
     return jsonify({
@@ -457,12 +1283,16 @@ def create_todo():
 
 @app.route('/api/todos/<todo_id>', methods=['PUT'])
 @require_auth
+@write_locked
 def update_todo(todo_id):
     """Update an existing todo"""
     data = request.get_json()
     current_user = get_current_user()
     
     todo_index = next((i for i, t in enumerate(todos) if t['id'] == todo_id), None)
+    if todo_index is None:
+        # Archived todos move back into the active list when changed
+        todo_index = unarchive('todos', todo_id, current_user['id'])
     if todo_index is None:
         return jsonify({'success': False, 'error': 'Todo not found'}), 404
     
@@ -470,7 +1300,8 @@ def update_todo(todo_id):
     if todos[todo_index].get('user_id') != current_user['id']:
         return jsonify({'success': False, 'error': 'Access denied'}), 403
     
-    todo = todos[todo_index]
+    todo = dict(todos[todo_index])
+    adjust_day_counters('todo', todos[todo_index], -1)
     
     # Update fields
     if 'text' in data:
@@ -485,6 +1316,9 @@ def update_todo(todo_id):
         todo['date'] = data['date']
     
     todo['updated_at'] = datetime.now().isoformat()
+    todos[todo_index] = todo
+    track_change('todos', todo['id'])
+    adjust_day_counters('todo', todo, 1)
     save_data()
     
     return jsonify({
@@ -495,12 +1329,16 @@ def update_todo(todo_id):
 
 @app.route('/api/todos/<todo_id>', methods=['DELETE'])
 @require_auth
+@write_locked
 def delete_todo(todo_id):
     """Delete a todo"""
     global todos
     current_user = get_current_user()
     
     todo_index = next((i for i, t in enumerate(todos) if t['id'] == todo_id), None)
+    if todo_index is None:
+        # Archived todos move back into the active list when changed
+        todo_index = unarchive('todos', todo_id, current_user['id'])
     if todo_index is None:
         return jsonify({'success': False, 'error': 'Todo not found'}), 404
     
@@ -509,6 +1347,8 @@ def delete_todo(todo_id):
         return jsonify({'success': False, 'error': 'Access denied'}), 403
     
     deleted_todo = todos.pop(todo_index)
+    track_change('todos', deleted_todo['id'], deleted=True)
+    adjust_day_counters('todo', deleted_todo, -1)
     save_data()
     
     return jsonify({
@@ -519,22 +1359,53 @@ def delete_todo(todo_id):
 
 # Calendar API Endpoints
 
+@app.route('/api/calendar/<int:year>/summary')
+@require_auth
+@read_locked
+def get_year_summary(year):
+    """Get per-day task, completed todo and focus minute counts for a year"""
+    current_user = get_current_user()
+    year_counts = get_day_counters().get(current_user['id'], {}).get(year, {})
+    days = {day: dict(counts) for day, counts in year_counts.items()}
+    
+    # Recurring tasks aren't counted per day, so expand the user's for this year only
+    for task in get_recurring_tasks(current_user['id']):
+        for occurrence in expand_occurrences(task, date(year, 1, 1), date(year, 12, 31)):
+            counts = days.setdefault(occurrence['occurrence_date'],
+                                     {'tasks': 0, 'completed_todos': 0, 'focus_minutes': 0})
+            counts['tasks'] += 1
+    
+    for counts in days.values():
+        counts['focus_minutes'] = round(counts['focus_minutes'], 1)
+    
+    return jsonify({
+        'success': True,
+        'year': year,
+        'days': days,
+        'totals': {
+            'tasks': sum(c['tasks'] for c in days.values()),
+            'completed_todos': sum(c['completed_todos'] for c in days.values()),
+            'focus_minutes': round(sum(c['focus_minutes'] for c in days.values()), 1)
+        }
+    })
+
 @app.route('/api/calendar/<int:year>/<int:month>')
 @require_auth
+@read_locked
 def get_calendar_data(year, month):
     """Get calendar data for a specific month"""
-    from calendar import monthrange
-    
     # Get first and last day of the month
     first_day = datetime(year, month, 1)
     last_day_num = monthrange(year, month)[1]
     last_day = datetime(year, month, last_day_num)
     
-    # Get tasks for this month (filtered by current user)
+    # Get tasks for this month (filtered by current user), archived ones included
     current_user = get_current_user()
     month_tasks = []
-    for task in tasks:
-        if task.get('user_id') == current_user['id'] and task.get('due_date'):
+    for task in tasks + load_archive()['tasks']:
+        if task.get('user_id') == current_user['id'] and task.get('recurrence'):
+            month_tasks.extend(expand_occurrences(task, first_day.date(), last_day.date()))
+        elif task.get('user_id') == current_user['id'] and task.get('due_date'):
             try:
                 task_date = datetime.fromisoformat(task['due_date'].replace('Z', '+00:00'))
                 if first_day <= task_date <= last_day:
@@ -556,6 +1427,7 @@ def get_calendar_data(year, month):
 
 @app.route('/api/timer/start', methods=['POST'])
 @require_auth
+@write_locked
 def start_timer():
     """Start a timer session"""
     data = request.get_json()
@@ -572,6 +1444,7 @@ def start_timer():
     }
     
     timer_sessions.append(session)
+    track_change('timer_sessions', session['id'])
     save_data()
     
     return jsonify({
@@ -582,13 +1455,15 @@ def start_timer():
 
 @app.route('/api/timer/complete/<session_id>', methods=['POST'])
 @require_auth
+@write_locked
 def complete_timer_session(session_id):
     """Complete a timer session"""
     session_index = next((i for i, s in enumerate(timer_sessions) if s['id'] == session_id), None)
     if session_index is None:
         return jsonify({'success': False, 'error': 'Session not found'}), 404
     
-    session = timer_sessions[session_index]
+    session = dict(timer_sessions[session_index])
+    adjust_day_counters('session', timer_sessions[session_index], -1)
     session['completed'] = True
     session['completed_at'] = datetime.now().isoformat()
     
@@ -597,6 +1472,9 @@ def complete_timer_session(session_id):
     completed_at = datetime.fromisoformat(session['completed_at'])
     actual_duration = (completed_at - started_at).total_seconds() / 60
     session['actual_duration_minutes'] = round(actual_duration, 2)
+    timer_sessions[session_index] = session
+    track_change('timer_sessions', session['id'])
+    adjust_day_counters('session', session, 1)
     
     save_data()
     
@@ -608,6 +1486,7 @@ def complete_timer_session(session_id):
 
 @app.route('/api/timer/sessions')
 @require_auth
+@read_locked
 def get_timer_sessions():
     """Get timer sessions"""
     current_user = get_current_user()
@@ -631,6 +1510,7 @@ def get_timer_sessions():
 
 @app.route('/api/analytics/productivity')
 @require_auth
+@read_locked
 def get_productivity_analytics():
     """Get productivity analytics"""
     current_user = get_current_user()
@@ -642,9 +1522,11 @@ def get_productivity_analytics():
     user_tasks = [t for t in tasks if t.get('user_id') == current_user['id']]
     user_sessions = [s for s in timer_sessions if s.get('user_id') == current_user['id']]
     
-    # Calculate task completion rates
-    total_tasks = len(user_tasks)
-    completed_tasks = len([t for t in user_tasks if t.get('completed')])
+    # Calculate task completion rates (archived tasks are all completed)
+    load_archive()
+    archived_tasks = archived_task_counts.get(current_user['id'], 0)
+    total_tasks = len(user_tasks) + archived_tasks
+    completed_tasks = len([t for t in user_tasks if t.get('completed')]) + archived_tasks
     
     # Tasks created this week
     week_tasks = []
@@ -692,6 +1574,7 @@ def get_productivity_analytics():
 
 @app.route('/api/search')
 @require_auth
+@read_locked
 def search_tasks():
     """Search tasks"""
     current_user = get_current_user()
@@ -702,6 +1585,8 @@ def search_tasks():
     
     # Filter tasks by current user
     user_tasks = [t for t in tasks if t.get('user_id') == current_user['id']]
+    if include_archived_requested():
+        user_tasks += [t for t in load_archive()['tasks'] if t.get('user_id') == current_user['id']]
     
     results = []
     for task in user_tasks:
@@ -726,11 +1611,76 @@ def health_check():
         'success': True,
         'status': 'healthy',
         'timestamp': datetime.now().isoformat(),
-        'version': '1.0.0'
+        'version': '1.0.0',
+        'shard': SHARD_INDEX,
+        'shard_count': SHARD_COUNT
+    })
+
+# Admin API
+
+@app.route('/api/admin/snapshots', methods=['GET'])
+@require_admin
+def get_snapshots():
+    """List snapshots"""
+    snapshots = list_snapshots(SNAPSHOT_DIR)
+    return jsonify({
+        'success': True,
+        'snapshots': snapshots,
+        'count': len(snapshots)
     })
 
+@app.route('/api/admin/snapshots', methods=['POST'])
+@require_admin
+def create_snapshot_endpoint():
+    """Take a full or incremental snapshot"""
+    data = request.get_json(silent=True) or {}
+    snapshot = create_snapshot(incremental=bool(data.get('incremental')))
+    return jsonify({
+        'success': True,
+        'snapshot': snapshot,
+        'message': 'Snapshot created successfully'
+    })
+
+@app.route('/api/admin/snapshots/restore', methods=['POST'])
+@require_admin
+def restore_snapshot_endpoint():
+    """Restore a snapshot by id, or the latest taken at or before a timestamp"""
+    data = request.get_json(silent=True) or {}
+    if not data.get('snapshot_id') and not data.get('at'):
+        return jsonify({'success': False, 'error': 'snapshot_id or at is required'}), 400
+    
+    try:
+        snapshot = restore_snapshot(snapshot_id=data.get('snapshot_id'), at=data.get('at'))
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    if snapshot is None:
+        return jsonify({'success': False, 'error': 'Snapshot not found'}), 404
+    
+    return jsonify({
+        'success': True,
+        'snapshot': snapshot,
+        'message': 'Snapshot restored successfully'
+    })
+
+@app.route('/api/metrics')
+def metrics_endpoint():
+    """Request, storage and collection size metrics in Prometheus text format"""
+    gauges = {
+        'tasks': len(tasks),
+        'todos': len(todos),
+        'timer_sessions': len(timer_sessions),
+        'users': len(users)
+    }
+    if archive is not None:
+        gauges['archived_tasks'] = len(archive['tasks'])
+        gauges['archived_todos'] = len(archive['todos'])
+    
+    return Response(metrics.render(gauges), mimetype='text/plain; version=0.0.4')
+
+# Load persisted data on import so WSGI servers like gunicorn serve it too
+load_data()
+
 if __name__ == '__main__':
-    load_data()
     print("🎉 Toodless Python Backend Starting...")
     print("📊 Features:")
     print("  ✅ Task Management API")
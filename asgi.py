@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Toodless ASGI Server
+Serves the Toodless API from an asyncio event loop.
+
+Connections, request bodies and responses are handled on the event loop, so
+slow or idle clients don't hold a worker thread. Only the view itself, which
+includes its blocking save_data() persistence, runs on a bounded thread pool.
+
+Run with:
+    python asgi.py
+    uvicorn asgi:application --host 0.0.0.0 --port 5000
+"""
+
+import asyncio
+import io
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Add current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from app import app
+
+# Threads available for running views; connections beyond this just wait on the loop
+ASGI_THREADS = int(os.environ.get('TOODLESS_ASGI_THREADS', '32'))
+
+
+class AsgiApp:
+    """ASGI application that runs a WSGI app's views on a thread pool"""
+
+    def __init__(self, wsgi_app, max_workers=ASGI_THREADS):
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='toodless-asgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        # Read the whole body on the loop before handing off to a thread
+        body = bytearray()
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return
+            body.extend(message.get('body', b''))
+            more_body = message.get('more_body', False)
+
+        loop = asyncio.get_running_loop()
+        status, headers, content = await loop.run_in_executor(
+            self.executor, self.call_wsgi, build_environ(scope, bytes(body))
+        )
+
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': content})
+
+    async def lifespan(self, receive, send):
+        """Handle server startup and shutdown events"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def call_wsgi(self, environ):
+        """Run the WSGI app to completion and return (status, headers, body)"""
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = [(name.lower().encode('latin-1'), value.encode('latin-1'))
+                                   for name, value in headers]
+
+        result = self.wsgi_app(environ, start_response)
+        try:
+            content = b''.join(result)
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return response['status'], response['headers'], content
+
+
+def build_environ(scope, body):
+    """Build a WSGI environ from an ASGI HTTP scope and request body"""
+    server_name, server_port = scope.get('server') or ('localhost', 80)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin-1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server_name,
+        'SERVER_PORT': str(server_port),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': scope['client'][0] if scope.get('client') else '',
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'CONTENT_LENGTH': str(len(body))
+    }
+
+    for name, value in scope.get('headers', []):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_TYPE':
+            environ['CONTENT_TYPE'] = value
+            continue
+        if name == 'CONTENT_LENGTH':
+            continue
+        key = f'HTTP_{name}'
+        if key in environ:
+            separator = '; ' if name == 'COOKIE' else ','
+            value = environ[key] + separator + value
+        environ[key] = value
+
+    return environ
+
+
+application = AsgiApp(app)
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("🎉 Starting Toodless (ASGI mode)")
+    print("🌐 Open your browser and go to: http://localhost:5000")
+    uvicorn.run(application, host='0.0.0.0', port=5000)
@@ -0,0 +1,90 @@
+"""
+Toodless Asset Pipeline
+Builds the HTML pages once at startup: inline <style> and <script> blocks are
+moved into fingerprinted files that can be cached forever, and every page and
+asset is precompressed so requests just pick the right bytes.
+"""
+
+import gzip
+import hashlib
+import re
+
+from flask import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Pages are revalidated with their ETag on every load; fingerprinted assets never change
+PAGE_CACHE_CONTROL = 'no-cache'
+ASSET_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+INLINE_STYLE = re.compile(r'<style[^>]*>(.*?)</style>', re.S | re.I)
+INLINE_SCRIPT = re.compile(r'<script(?![^>]*\bsrc=)[^>]*>(.*?)</script>', re.S | re.I)
+
+
+class Asset:
+    """A response body with its precompressed variants and ETag"""
+
+    def __init__(self, body, content_type):
+        self.body = body
+        self.content_type = content_type
+        self.digest = hashlib.sha256(body).hexdigest()
+        self.variants = {'identity': body, 'gzip': gzip.compress(body, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            self.variants['br'] = brotli.compress(body)
+
+
+class AssetPipeline:
+    """Holds the built pages and the assets extracted from them"""
+
+    def __init__(self, url_prefix='/static/build/'):
+        self.url_prefix = url_prefix
+        self.pages = {}
+        self.assets = {}
+
+    def add_page(self, name, html):
+        """Register a page, moving its inline CSS and JS into fingerprinted assets"""
+        stem = name.rsplit('.', 1)[0]
+
+        def extract(match, extension, content_type, tag):
+            asset = Asset(match.group(1).strip().encode('utf-8'), content_type)
+            filename = f'{stem}.{asset.digest[:12]}.{extension}'
+            self.assets[filename] = asset
+            return tag.format(url=self.url_prefix + filename)
+
+        html = INLINE_STYLE.sub(
+            lambda m: extract(m, 'css', 'text/css; charset=utf-8', '<link rel="stylesheet" href="{url}">'), html)
+        html = INLINE_SCRIPT.sub(
+            lambda m: extract(m, 'js', 'application/javascript; charset=utf-8', '<script src="{url}"></script>'), html)
+        self.pages[name] = Asset(html.encode('utf-8'), 'text/html; charset=utf-8')
+
+    def page_response(self, name, request):
+        """Serve a built page"""
+        return self.respond(self.pages[name], request, PAGE_CACHE_CONTROL)
+
+    def asset_response(self, filename, request):
+        """Serve an extracted asset, or None if there is no such asset"""
+        asset = self.assets.get(filename)
+        if asset is None:
+            return None
+        return self.respond(asset, request, ASSET_CACHE_CONTROL)
+
+    def respond(self, asset, request, cache_control):
+        """Build a response, choosing an encoding and honouring If-None-Match"""
+        accepted = request.accept_encodings
+        encoding = next((e for e in ('br', 'gzip') if e in asset.variants and accepted[e]), 'identity')
+        etag = asset.digest[:32] if encoding == 'identity' else f'{asset.digest[:32]}-{encoding}'
+
+        if etag in request.if_none_match:
+            response = Response(status=304)
+        else:
+            response = Response(asset.variants[encoding], content_type=asset.content_type)
+            if encoding != 'identity':
+                response.headers['Content-Encoding'] = encoding
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = cache_control
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
@@ -0,0 +1,576 @@
+#!/usr/bin/env python3
+"""
+Toodless Benchmark Suite
+Generates synthetic data and drives the API through a realistic request mix,
+either in-process through the Flask test client or against a real gunicorn
+(WSGI) or uvicorn (ASGI) server, reporting p50/p99 latency and throughput per operation.
+
+Examples:
+    python bench.py --target client --users 20 --tasks 500
+    python bench.py --target gunicorn --threads 4 --concurrency 16
+    python bench.py --target uvicorn --concurrency 64
+    python bench.py --json results.json
+    python bench.py --baseline results.json
+    python bench.py --stress --concurrency 64 --duration 20
+"""
+
+import argparse
+import hashlib
+import http.cookiejar
+import json
+import math
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime, timedelta
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+PASSWORD = 'benchmark-password'
+PROJECTS = ['personal', 'work', 'health']
+PRIORITIES = ['high', 'medium', 'low']
+WORDS = ['review', 'plan', 'call', 'write', 'report', 'groceries', 'workout', 'meeting',
+         'budget', 'design', 'email', 'invoice', 'deploy', 'read', 'clean', 'doctor']
+
+# Relative weights of each operation in the request mix
+DEFAULT_MIX = {
+    'list_tasks': 20,
+    'list_tasks_by_date': 10,
+    'list_todos': 8,
+    'calendar_month': 15,
+    'calendar_year': 4,
+    'search': 12,
+    'analytics': 8,
+    'timer_sessions': 5,
+    'create_task': 7,
+    'update_task': 5,
+    'create_todo': 3,
+    'complete_todo': 3
+}
+
+
+# Synthetic data generation
+
+def random_day(rng, today, spread_days):
+    """Pick a random date within spread_days of today"""
+    return today + timedelta(days=rng.randint(-spread_days, spread_days))
+
+
+def generate_data(data_dir, users=10, tasks=200, todos=100, sessions=50, seed=42):
+    """Write synthetic users, tasks, todos and timer sessions to data_dir
+
+    Counts for tasks, todos and sessions are per user. Returns the generated
+    users (with their plaintext password) and the ids of each user's open
+    tasks and todos, which the update operations target.
+    """
+    rng = random.Random(seed)
+    now = datetime.now()
+    today = now.date()
+    data = {'users': [], 'tasks': [], 'todos': [], 'sessions': []}
+    accounts = []
+
+    for u in range(users):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        email = f'user{u}@bench.local'
+        data['users'].append({
+            'id': user_id,
+            'name': f'Bench User {u}',
+            'email': email,
+            'password_hash': hashlib.sha256(PASSWORD.encode()).hexdigest(),
+            'created_at': now.isoformat(),
+            'updated_at': now.isoformat()
+        })
+        account = {'email': email, 'password': PASSWORD, 'task_ids': [], 'todo_ids': []}
+
+        for _ in range(tasks):
+            completed = rng.random() < 0.4
+            created = now - timedelta(days=rng.randint(0, 120))
+            task = {
+                'id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'user_id': user_id,
+                'title': ' '.join(rng.sample(WORDS, 3)),
+                'description': ' '.join(rng.sample(WORDS, 6)),
+                'project': rng.choice(PROJECTS),
+                'priority': rng.choice(PRIORITIES),
+                'status': 'completed' if completed else 'todo',
+                'due_date': random_day(rng, today, 180).isoformat(),
+                'start_time': None,
+                'end_time': None,
+                'location': '',
+                'created_at': created.isoformat(),
+                'updated_at': created.isoformat(),
+                'completed': completed,
+                'completed_at': (created + timedelta(days=1)).isoformat() if completed else None,
+                'recurrence': None,
+                'occurrence_overrides': {}
+            }
+            if rng.random() < 0.02:
+                task['recurrence'] = {'freq': rng.choice(['daily', 'weekly', 'monthly']), 'interval': 1,
+                                      'count': None, 'until': None, 'exceptions': []}
+            data['tasks'].append(task)
+            if not completed:
+                account['task_ids'].append(task['id'])
+
+        for _ in range(todos):
+            completed = rng.random() < 0.5
+            created = now - timedelta(days=rng.randint(0, 60))
+            todo = {
+                'id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'user_id': user_id,
+                'text': ' '.join(rng.sample(WORDS, 2)),
+                'date': random_day(rng, today, 60).isoformat(),
+                'completed': completed,
+                'created_at': created.isoformat(),
+                'updated_at': created.isoformat(),
+                'completed_at': created.isoformat() if completed else None
+            }
+            data['todos'].append(todo)
+            if not completed:
+                account['todo_ids'].append(todo['id'])
+
+        for _ in range(sessions):
+            started = now - timedelta(days=rng.randint(0, 30), minutes=rng.randint(0, 1440))
+            duration = rng.choice([5, 15, 25, 50])
+            data['sessions'].append({
+                'id': str(uuid.UUID(int=rng.getrandbits(128))),
+                'user_id': user_id,
+                'type': rng.choice(['focus', 'focus', 'break']),
+                'duration_minutes': duration,
+                'task_id': rng.choice(account['task_ids']) if account['task_ids'] else None,
+                'started_at': started.isoformat(),
+                'completed': True,
+                'completed_at': (started + timedelta(minutes=duration)).isoformat(),
+                'actual_duration_minutes': duration
+            })
+
+        accounts.append(account)
+
+    os.makedirs(data_dir, exist_ok=True)
+    for name in ['users', 'tasks', 'todos', 'sessions']:
+        with open(os.path.join(data_dir, f'{name}.json'), 'w') as f:
+            json.dump(data[name], f)
+
+    return accounts
+
+
+# Workload
+
+class Workload:
+    """Picks operations from the request mix and builds their requests"""
+
+    def __init__(self, mix, seed):
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.rng = random.Random(seed)
+        self.today = datetime.now().date()
+
+    def next_request(self, account):
+        """Return (operation, method, path, json_body) for the next request"""
+        rng = self.rng
+        op = rng.choices(self.names, self.weights)[0]
+        day = random_day(rng, self.today, 90)
+
+        if op == 'list_tasks':
+            return op, 'GET', '/api/tasks', None
+        if op == 'list_tasks_by_date':
+            return op, 'GET', f'/api/tasks?date={day.isoformat()}', None
+        if op == 'list_todos':
+            return op, 'GET', f'/api/todos?date={day.isoformat()}', None
+        if op == 'calendar_month':
+            return op, 'GET', f'/api/calendar/{day.year}/{day.month}', None
+        if op == 'calendar_year':
+            return op, 'GET', f'/api/calendar/{day.year}/summary', None
+        if op == 'search':
+            return op, 'GET', f'/api/search?q={rng.choice(WORDS)}', None
+        if op == 'analytics':
+            return op, 'GET', '/api/analytics/productivity', None
+        if op == 'timer_sessions':
+            return op, 'GET', '/api/timer/sessions', None
+        if op == 'create_task':
+            body = {'title': ' '.join(rng.sample(WORDS, 3)), 'project': rng.choice(PROJECTS),
+                    'priority': rng.choice(PRIORITIES), 'due_date': day.isoformat()}
+            return op, 'POST', '/api/tasks', body
+        if op == 'update_task' and account['task_ids']:
+            task_id = rng.choice(account['task_ids'])
+            return op, 'PUT', f'/api/tasks/{task_id}', {'priority': rng.choice(PRIORITIES)}
+        if op == 'create_todo':
+            return op, 'POST', '/api/todos', {'text': rng.choice(WORDS), 'date': day.isoformat()}
+        if op == 'complete_todo' and account['todo_ids']:
+            todo_id = rng.choice(account['todo_ids'])
+            return op, 'PUT', f'/api/todos/{todo_id}', {'completed': rng.random() < 0.7}
+        return 'list_tasks', 'GET', '/api/tasks', None
+
+
+# Drivers
+
+class FlaskClientDriver:
+    """Sends requests in-process through the Flask test client"""
+
+    def __init__(self, data_root):
+        os.chdir(data_root)
+        sys.path.insert(0, REPO_DIR)
+        import app as toodless
+        self.app = toodless.app
+
+    def login(self, account):
+        client = self.app.test_client()
+        response = client.post('/api/auth/login', json={'email': account['email'], 'password': account['password']})
+        if response.status_code != 200:
+            raise RuntimeError(f"Login failed for {account['email']}: {response.status_code}")
+        return client
+
+    def send(self, client, method, path, body):
+        response = client.open(path, method=method, json=body)
+        response.get_data()
+        return response.status_code
+
+    def close(self):
+        pass
+
+
+class ServerDriver:
+    """Sends requests over HTTP to a gunicorn or uvicorn server started for the run"""
+
+    def __init__(self, data_root, target, workers, threads):
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+        self.base_url = f'http://127.0.0.1:{port}'
+
+        if target == 'uvicorn':
+            command = [sys.executable, '-m', 'uvicorn', '--workers', str(workers), '--host', '127.0.0.1',
+                       '--port', str(port), '--log-level', 'warning', 'asgi:application']
+        else:
+            command = [sys.executable, '-m', 'gunicorn', '--workers', str(workers), '--threads', str(threads),
+                       '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app']
+
+        env = dict(os.environ, PYTHONPATH=REPO_DIR)
+        self.target = target
+        self.process = subprocess.Popen(command, cwd=data_root, env=env)
+        self.wait_until_ready()
+
+    def wait_until_ready(self, timeout=15):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            try:
+                urllib.request.urlopen(self.base_url + '/api/health', timeout=1).read()
+                return
+            except (urllib.error.URLError, ConnectionError):
+                if self.process.poll() is not None:
+                    raise RuntimeError(f'{self.target} exited during startup')
+                time.sleep(0.1)
+        raise RuntimeError(f'{self.target} did not become ready in time')
+
+    def login(self, account):
+        opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()))
+        status = self.send(opener, 'POST', '/api/auth/login',
+                           {'email': account['email'], 'password': account['password']})
+        if status != 200:
+            raise RuntimeError(f"Login failed for {account['email']}: {status}")
+        return opener
+
+    def send(self, opener, method, path, body):
+        data = json.dumps(body).encode() if body is not None else None
+        request = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with opener.open(request, timeout=30) as response:
+                response.read()
+                return response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            return e.code
+
+    def close(self):
+        self.process.terminate()
+        try:
+            self.process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+
+
+# Running and reporting
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = math.ceil(pct * len(sorted_values) / 100)
+    index = max(0, min(len(sorted_values) - 1, rank - 1))
+    return sorted_values[index]
+
+
+def run_benchmark(driver, accounts, requests, concurrency, mix, seed, warmup):
+    """Drive the request mix and return per-operation latencies and errors"""
+    clients = [(account, driver.login(account)) for account in accounts]
+    latencies = {}
+    errors = {}
+    lock = threading.Lock()
+    counter = iter(range(requests + warmup))
+
+    def worker(worker_index):
+        workload = Workload(mix, seed + worker_index)
+        local_latencies = {}
+        local_errors = {}
+        while True:
+            with lock:
+                n = next(counter, None)
+            if n is None:
+                break
+            account, client = clients[n % len(clients)]
+            op, method, path, body = workload.next_request(account)
+            started = time.perf_counter()
+            status = driver.send(client, method, path, body)
+            elapsed = time.perf_counter() - started
+            if n < warmup:
+                continue
+            local_latencies.setdefault(op, []).append(elapsed)
+            if status >= 400:
+                local_errors[op] = local_errors.get(op, 0) + 1
+        with lock:
+            for op, values in local_latencies.items():
+                latencies.setdefault(op, []).extend(values)
+            for op, count in local_errors.items():
+                errors[op] = errors.get(op, 0) + count
+
+    started = time.perf_counter()
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    return summarize(latencies, errors, elapsed)
+
+
+def summarize(latencies, errors, elapsed):
+    """Turn raw latencies into p50/p99/throughput figures"""
+    operations = {}
+    all_values = []
+    for op, values in sorted(latencies.items()):
+        values.sort()
+        all_values.extend(values)
+        operations[op] = {
+            'count': len(values),
+            'errors': errors.get(op, 0),
+            'mean_ms': round(sum(values) / len(values) * 1000, 3),
+            'p50_ms': round(percentile(values, 50) * 1000, 3),
+            'p99_ms': round(percentile(values, 99) * 1000, 3)
+        }
+    all_values.sort()
+    return {
+        'requests': len(all_values),
+        'errors': sum(errors.values()),
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_rps': round(len(all_values) / elapsed, 1) if elapsed else 0.0,
+        'p50_ms': round(percentile(all_values, 50) * 1000, 3),
+        'p99_ms': round(percentile(all_values, 99) * 1000, 3),
+        'operations': operations
+    }
+
+
+def print_report(results, baseline=None):
+    """Print a results table, with deltas against a baseline if given"""
+    def delta(current, previous):
+        if not previous:
+            return ''
+        return f' ({(current - previous) / previous * 100:+.1f}%)'
+
+    base_ops = baseline['operations'] if baseline else {}
+    print(f"{'operation':<20}{'count':>8}{'errors':>8}{'mean ms':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    print('-' * 66)
+    for op, stats in results['operations'].items():
+        line = f"{op:<20}{stats['count']:>8}{stats['errors']:>8}{stats['mean_ms']:>10.2f}" \
+               f"{stats['p50_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+        if op in base_ops:
+            line += f"   p50{delta(stats['p50_ms'], base_ops[op]['p50_ms'])} p99{delta(stats['p99_ms'], base_ops[op]['p99_ms'])}"
+        print(line)
+    print('-' * 66)
+    print(f"Requests: {results['requests']}  Errors: {results['errors']}  Elapsed: {results['elapsed_seconds']}s")
+    summary = f"Throughput: {results['throughput_rps']} req/s  p50: {results['p50_ms']} ms  p99: {results['p99_ms']} ms"
+    if baseline:
+        summary += f"  (throughput{delta(results['throughput_rps'], baseline['throughput_rps'])}," \
+                   f" p50{delta(results['p50_ms'], baseline['p50_ms'])}, p99{delta(results['p99_ms'], baseline['p99_ms'])})"
+    print(summary)
+
+
+def run_stress(driver, accounts, concurrency, duration, seed):
+    """Hammer the in-process app from many threads and check its invariants
+
+    Writers flip shared tasks between a 'done' and an 'open' state in a single
+    update while readers check they only ever see one state or the other,
+    never a mix of fields from both. Returns a list of failure descriptions.
+    """
+    import app as toodless
+
+    failures = []
+    operations = [0]
+    lock = threading.Lock()
+    deadline = time.time() + duration
+
+    def fail(message):
+        with lock:
+            if len(failures) < 20:
+                failures.append(message)
+
+    def check_task(task):
+        if task.get('title') not in ('done', 'open'):
+            return
+        done = task['title'] == 'done'
+        if bool(task.get('completed')) != done or (task.get('completed_at') is not None) != done:
+            fail(f"half-updated task {task['id']}: title={task['title']} completed={task.get('completed')} "
+                 f"completed_at={task.get('completed_at')}")
+
+    def worker(worker_index):
+        rng = random.Random(seed + worker_index)
+        account = accounts[worker_index % len(accounts)]
+        client = driver.login(account)
+        shared_ids = account['task_ids'][:3]
+        count = 0
+        while time.time() < deadline:
+            roll = rng.random()
+            if roll < 0.25 and shared_ids:
+                done = rng.random() < 0.5
+                response = client.put(f'/api/tasks/{rng.choice(shared_ids)}',
+                                      json={'title': 'done' if done else 'open', 'completed': done})
+            elif roll < 0.35:
+                response = client.post('/api/tasks', json={'title': 'stress', 'due_date': '2025-06-01'})
+                if response.status_code == 200:
+                    response = client.delete(f"/api/tasks/{response.get_json()['task']['id']}")
+            elif roll < 0.45:
+                response = client.get('/api/calendar/2025/summary')
+                if response.status_code == 200:
+                    for day, counts in response.get_json()['days'].items():
+                        if min(counts.values()) < 0:
+                            fail(f'negative day counter on {day}: {counts}')
+            else:
+                response = client.get('/api/tasks')
+                if response.status_code == 200:
+                    for task in response.get_json()['tasks']:
+                        check_task(task)
+            if response.status_code >= 500:
+                fail(f'{response.request.method} {response.request.path} returned {response.status_code}')
+            count += 1
+        with lock:
+            operations[0] += count
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Every acknowledged write must already be on disk from the workers' own
+    # saves, so compare the files with memory record by record without saving again
+    with toodless.data_lock.read(), toodless.save_lock:
+        for file_path, records in [(toodless.TASKS_FILE, toodless.tasks), (toodless.TODOS_FILE, toodless.todos),
+                                   (toodless.SESSIONS_FILE, toodless.timer_sessions),
+                                   (toodless.USERS_FILE, toodless.users)]:
+            with open(file_path) as f:
+                saved = {record['id']: record for record in json.load(f)}
+            in_memory = {record['id']: record for record in records}
+            for record_id in sorted(saved.keys() | in_memory.keys()):
+                if saved.get(record_id) != in_memory.get(record_id):
+                    fail(f'{os.path.basename(file_path)}: record {record_id} on disk '
+                         f'{saved.get(record_id)} differs from memory {in_memory.get(record_id)}')
+
+    print(f"Completed {operations[0]} operations in {duration}s across {concurrency} threads")
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Toodless API benchmark')
+    parser.add_argument('--target', choices=['client', 'gunicorn', 'uvicorn'], default='client',
+                        help='Flask test client (in-process), or a real gunicorn (WSGI) or uvicorn (ASGI) server')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--tasks', type=int, default=200, help='tasks per user')
+    parser.add_argument('--todos', type=int, default=100, help='todos per user')
+    parser.add_argument('--sessions', type=int, default=50, help='timer sessions per user')
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=1, help='client threads')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='server worker processes (only 1 is supported: each process has its own store)')
+    parser.add_argument('--threads', type=int, default=1, help='gunicorn threads per worker')
+    parser.add_argument('--mix', help='JSON object of operation weights overriding the default mix')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--data-dir', help='directory to generate data in (default: a temporary directory)')
+    parser.add_argument('--json', help='write results to this file')
+    parser.add_argument('--baseline', help='compare against results previously written with --json')
+    parser.add_argument('--stress', action='store_true',
+                        help='run the thread-safety stress test in-process instead of the benchmark')
+    parser.add_argument('--duration', type=float, default=10, help='stress test duration in seconds')
+    parser.add_argument('--archive-after-days', type=int, default=0,
+                        help='TOODLESS_ARCHIVE_AFTER_DAYS for the app under test (default 0: no archival, '
+                             'so the generated data stays in the hot set for the whole run)')
+    args = parser.parse_args(argv)
+    if args.workers > 1:
+        # Worker processes don't share the in-memory store and overwrite each
+        # other's data files, so writes would be silently lost
+        parser.error('--workers > 1 is not supported: each worker process keeps its own in-memory store')
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    mix = dict(DEFAULT_MIX)
+    if args.mix:
+        mix.update(json.loads(args.mix))
+
+    # Set before the app is imported or started, so every driver uses it
+    os.environ['TOODLESS_ARCHIVE_AFTER_DAYS'] = str(args.archive_after_days)
+    data_root = args.data_dir or tempfile.mkdtemp(prefix='toodless-bench-')
+    print(f"📦 Generating {args.users} users x {args.tasks} tasks / {args.todos} todos / "
+          f"{args.sessions} sessions in {data_root}")
+    accounts = generate_data(os.path.join(data_root, 'data'), args.users, args.tasks,
+                             args.todos, args.sessions, args.seed)
+
+    if args.stress:
+        print(f"🧪 Stress testing with {args.concurrency} threads for {args.duration}s")
+        try:
+            failures = run_stress(FlaskClientDriver(data_root), accounts, args.concurrency, args.duration, args.seed)
+        finally:
+            if not args.data_dir:
+                shutil.rmtree(data_root, ignore_errors=True)
+        for failure in failures:
+            print(f"❌ {failure}")
+        print("✅ No invariant violations" if not failures else f"❌ {len(failures)} failures")
+        sys.exit(1 if failures else 0)
+
+    if args.target in ('gunicorn', 'uvicorn'):
+        driver = ServerDriver(data_root, args.target, args.workers, args.threads)
+    else:
+        driver = FlaskClientDriver(data_root)
+
+    print(f"🚀 Running {args.requests} requests against {args.target} with concurrency {args.concurrency}")
+    try:
+        results = run_benchmark(driver, accounts, args.requests, args.concurrency, mix, args.seed, args.warmup)
+    finally:
+        driver.close()
+        if not args.data_dir:
+            shutil.rmtree(data_root, ignore_errors=True)
+
+    results['config'] = {k: v for k, v in vars(args).items() if k not in ('json', 'baseline', 'data_dir')}
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""
+Toodless Cold Store
+File format of the compressed archive of old completed tasks and todos.
+
+The archive is a gzip file holding a sequence of JSON batches. Archiving
+appends a batch of records as a new gzip member instead of rewriting the
+file, and moving records back out appends a batch listing their ids under
+'removed'. Reading replays the batches in order.
+"""
+
+import gzip
+import json
+import os
+import re
+
+COLLECTIONS = ('tasks', 'todos')
+WHITESPACE = re.compile(r'\s*')
+
+
+def read_archive(path):
+    """Replay an archive file into {'tasks': [...], 'todos': [...]}"""
+    by_id = {name: {} for name in COLLECTIONS}
+    if os.path.exists(path):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            text = f.read()
+        decoder = json.JSONDecoder()
+        position = WHITESPACE.match(text).end()
+        while position < len(text):
+            batch, position = decoder.raw_decode(text, position)
+            position = WHITESPACE.match(text, position).end()
+            for name in COLLECTIONS:
+                for record_id in batch.get('removed', {}).get(name, []):
+                    by_id[name].pop(record_id, None)
+                for record in batch.get(name, []):
+                    by_id[name][record['id']] = record
+    return {name: list(records.values()) for name, records in by_id.items()}
+
+
+def append_batch(path, batch):
+    """Append a batch to an archive file without rewriting what is already there"""
+    with gzip.open(path, 'at', encoding='utf-8') as f:
+        f.write(json.dumps(batch) + '\n')
+
+
+def write_archive(path, store):
+    """Rewrite an archive file as a single batch holding the whole store"""
+    temp_path = f"{path}.tmp"
+    with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+        f.write(json.dumps({name: store.get(name, []) for name in COLLECTIONS}) + '\n')
+    os.replace(temp_path, path)
@@ -0,0 +1,126 @@
+"""
+Toodless Metrics
+In-process request and storage metrics, rendered in Prometheus text format
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+# Histogram bucket upper bounds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (128, 512, 2048, 8192, 32768, 131072, 524288, 2097152)
+
+
+class Histogram:
+    """Fixed-bucket histogram with a running sum and count"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        """Record a single value"""
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def render(self, name, labels):
+        """Render the histogram as Prometheus text lines"""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{format_labels(labels, le=bound)} {cumulative}')
+        lines.append(f'{name}_sum{format_labels(labels)} {round(self.sum, 6)}')
+        lines.append(f'{name}_count{format_labels(labels)} {self.count}')
+        return lines
+
+
+def format_labels(labels, **extra):
+    """Format a label dict as a Prometheus label set"""
+    items = list(labels.items()) + list(extra.items())
+    if not items:
+        return ''
+    return '{' + ','.join(f'{key}="{value}"' for key, value in items) + '}'
+
+
+class MetricsRegistry:
+    """Collects per-endpoint request metrics and storage operation timings"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.request_latency = {}
+        self.response_size = {}
+        self.request_count = {}
+        self.storage_latency = {}
+
+    def observe_request(self, endpoint, method, status, seconds, size):
+        """Record one handled request"""
+        key = (endpoint, method)
+        with self.lock:
+            if key not in self.request_latency:
+                self.request_latency[key] = Histogram(LATENCY_BUCKETS)
+                self.response_size[key] = Histogram(SIZE_BUCKETS)
+            self.request_latency[key].observe(seconds)
+            self.response_size[key].observe(size)
+            count_key = (endpoint, method, status)
+            self.request_count[count_key] = self.request_count.get(count_key, 0) + 1
+
+    def observe_storage(self, operation, seconds):
+        """Record the duration of a storage operation"""
+        with self.lock:
+            if operation not in self.storage_latency:
+                self.storage_latency[operation] = Histogram(LATENCY_BUCKETS)
+            self.storage_latency[operation].observe(seconds)
+
+    def timed(self, operation):
+        """Decorator recording how long a storage function takes"""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return f(*args, **kwargs)
+                finally:
+                    self.observe_storage(operation, time.perf_counter() - started)
+            return decorated_function
+        return decorator
+
+    def render(self, gauges=None):
+        """Render all metrics, plus the given gauge values, in Prometheus text format"""
+        lines = []
+        with self.lock:
+            lines.append('# HELP toodless_requests_total Requests handled by endpoint, method and status')
+            lines.append('# TYPE toodless_requests_total counter')
+            for (endpoint, method, status), count in sorted(self.request_count.items()):
+                labels = {'endpoint': endpoint, 'method': method, 'status': status}
+                lines.append(f'toodless_requests_total{format_labels(labels)} {count}')
+
+            lines.append('# HELP toodless_request_duration_seconds Request latency by endpoint and method')
+            lines.append('# TYPE toodless_request_duration_seconds histogram')
+            for (endpoint, method), histogram in sorted(self.request_latency.items()):
+                labels = {'endpoint': endpoint, 'method': method}
+                lines.extend(histogram.render('toodless_request_duration_seconds', labels))
+
+            lines.append('# HELP toodless_response_size_bytes Response body size by endpoint and method')
+            lines.append('# TYPE toodless_response_size_bytes histogram')
+            for (endpoint, method), histogram in sorted(self.response_size.items()):
+                labels = {'endpoint': endpoint, 'method': method}
+                lines.extend(histogram.render('toodless_response_size_bytes', labels))
+
+            lines.append('# HELP toodless_storage_duration_seconds Duration of storage operations')
+            lines.append('# TYPE toodless_storage_duration_seconds histogram')
+            for operation, histogram in sorted(self.storage_latency.items()):
+                lines.extend(histogram.render('toodless_storage_duration_seconds', {'operation': operation}))
+
+        if gauges:
+            lines.append('# HELP toodless_collection_size Number of records held in each collection')
+            lines.append('# TYPE toodless_collection_size gauge')
+            for collection, size in sorted(gauges.items()):
+                lines.append(f'toodless_collection_size{format_labels({"collection": collection})} {size}')
+
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Toodless Shard Router
+Forwards requests to the backend node that owns the user's shard.
+
+Users are assigned to shards by a stable hash of their user id (see
+sharding.py). Login and signup are routed from the email in the request body,
+since user ids are derived from emails; the router then remembers the shard
+in a cookie for the rest of the session.
+
+Examples:
+    # Route to nodes that are already running
+    TOODLESS_SHARDS=http://127.0.0.1:5001,http://127.0.0.1:5002 python router.py
+
+    # Start N local nodes (data in data/shard-<i>/) plus the router
+    python router.py --spawn 3
+
+    # Split an existing single-node data/ directory into N shard directories
+    python router.py --split 3
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from urllib.parse import urlsplit
+
+# Add current directory to Python path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, Response, request
+
+from coldstore import read_archive, write_archive
+from sharding import shard_for_user, user_id_for_email
+
+SHARD_COOKIE = 'toodless_shard'
+COLLECTIONS = ['users', 'tasks', 'todos', 'sessions']
+
+# Headers that apply to a single connection and must not be forwarded
+HOP_BY_HOP_HEADERS = {'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+                      'te', 'trailers', 'transfer-encoding', 'upgrade', 'host', 'content-length'}
+
+router = Flask(__name__)
+shard_urls = [url.strip() for url in os.environ.get('TOODLESS_SHARDS', '').split(',') if url.strip()]
+
+
+def forward(shard, path, body):
+    """Send the current request to a shard and return (status, headers, body)"""
+    target = urlsplit(shard_urls[shard])
+    connection = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+    headers = {name: value for name, value in request.headers.items() if name.lower() not in HOP_BY_HOP_HEADERS}
+    headers['X-Forwarded-For'] = request.remote_addr or ''
+    try:
+        connection.request(request.method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response_headers = [(name, value) for name, value in response.getheaders()
+                            if name.lower() not in HOP_BY_HOP_HEADERS]
+        return response.status, response_headers, response.read()
+    finally:
+        connection.close()
+
+
+def shard_for_request(body):
+    """Pick the shard for the current request"""
+    if request.path in ('/api/auth/login', '/api/auth/signup'):
+        try:
+            email = json.loads(body or b'{}').get('email')
+        except (ValueError, AttributeError):
+            email = None
+        if email:
+            return shard_for_user(user_id_for_email(email), len(shard_urls))
+
+    try:
+        shard = int(request.cookies.get(SHARD_COOKIE, 0))
+    except ValueError:
+        shard = 0
+    return shard if 0 <= shard < len(shard_urls) else 0
+
+
+@router.route('/', defaults={'path': ''}, methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'OPTIONS', 'HEAD'])
+@router.route('/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH', 'OPTIONS', 'HEAD'])
+def route_request(path):
+    """Forward a request to the node owning the user's shard"""
+    body = request.get_data()
+    full_path = request.full_path if request.query_string else request.path
+    shard = shard_for_request(body)
+
+    try:
+        status, headers, content = forward(shard, full_path, body)
+    except (OSError, http.client.HTTPException) as e:
+        return Response(json.dumps({'success': False, 'error': f'Shard {shard} unavailable: {e}'}),
+                        status=502, mimetype='application/json')
+
+    # Passing the headers in keeps Response from adding its own default Content-Type
+    response = Response(content, status=status, headers=headers)
+
+    if request.path in ('/api/auth/login', '/api/auth/signup') and status == 200:
+        response.set_cookie(SHARD_COOKIE, str(shard), httponly=True, samesite='Lax')
+    elif request.path == '/api/auth/logout':
+        response.delete_cookie(SHARD_COOKIE)
+    return response
+
+
+def split_data(source_dir, shard_count):
+    """Split a single-node data directory into data/shard-<i>/ directories by user"""
+    shard_of_user = {}
+    records = {}
+    for name in COLLECTIONS:
+        path = os.path.join(source_dir, f'{name}.json')
+        records[name] = []
+        if os.path.exists(path):
+            with open(path) as f:
+                records[name] = json.load(f)
+
+    archive = None
+    archive_path = os.path.join(source_dir, 'archive.json.gz')
+    if os.path.exists(archive_path):
+        archive = read_archive(archive_path)
+
+    # Users created before ids were derived from emails are re-keyed to the id
+    # of their email, so each one lands on the shard the router picks at signup
+    # and login and can't register again on another shard
+    new_ids = {user['id']: user_id_for_email(user['email']) for user in records['users']}
+    rekeyed = sum(1 for old_id, new_id in new_ids.items() if old_id != new_id)
+    for user in records['users']:
+        user['id'] = new_ids[user['id']]
+    owned_records = [r for name in COLLECTIONS if name != 'users' for r in records[name]]
+    if archive is not None:
+        owned_records += archive['tasks'] + archive['todos']
+    for record in owned_records:
+        if record.get('user_id') in new_ids:
+            record['user_id'] = new_ids[record['user_id']]
+    if rekeyed:
+        print(f"🔑 Re-keyed {rekeyed} users to email-derived ids")
+
+    for user in records['users']:
+        shard_of_user[user['id']] = shard_for_user(user['id'], shard_count)
+
+    for shard in range(shard_count):
+        shard_dir = os.path.join(source_dir, f'shard-{shard}')
+        os.makedirs(shard_dir, exist_ok=True)
+        for name in COLLECTIONS:
+            key = 'id' if name == 'users' else 'user_id'
+            shard_records = [r for r in records[name] if shard_of_user.get(r.get(key)) == shard]
+            with open(os.path.join(shard_dir, f'{name}.json'), 'w') as f:
+                json.dump(shard_records, f, indent=2)
+        if archive is not None:
+            shard_archive = {name: [r for r in archive.get(name, []) if shard_of_user.get(r.get('user_id')) == shard]
+                             for name in ('tasks', 'todos')}
+            write_archive(os.path.join(shard_dir, 'archive.json.gz'), shard_archive)
+        print(f"✅ Shard {shard}: {sum(1 for s in shard_of_user.values() if s == shard)} users -> {shard_dir}")
+
+
+def spawn_nodes(shard_count, base_port, threads):
+    """Start one local gunicorn node per shard and return (processes, urls)"""
+    processes = []
+    urls = []
+    for shard in range(shard_count):
+        port = base_port + shard
+        env = dict(os.environ,
+                   TOODLESS_SHARD_COUNT=str(shard_count),
+                   TOODLESS_SHARD_INDEX=str(shard),
+                   PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+        processes.append(subprocess.Popen(
+            [sys.executable, '-m', 'gunicorn', '--threads', str(threads),
+             '--bind', f'127.0.0.1:{port}', '--log-level', 'warning', 'app:app'],
+            env=env
+        ))
+        urls.append(f'http://127.0.0.1:{port}')
+
+    for url in urls:
+        deadline = time.time() + 15
+        while True:
+            try:
+                urllib.request.urlopen(url + '/api/health', timeout=1).read()
+                break
+            except (urllib.error.URLError, ConnectionError):
+                if time.time() > deadline:
+                    raise RuntimeError(f'Node at {url} did not start')
+                time.sleep(0.1)
+    return processes, urls
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Toodless shard router')
+    parser.add_argument('--port', type=int, default=5000, help='router port')
+    parser.add_argument('--spawn', type=int, metavar='N', help='start N local shard nodes')
+    parser.add_argument('--base-port', type=int, default=5001, help='port of the first spawned node')
+    parser.add_argument('--threads', type=int, default=4, help='threads per spawned node')
+    parser.add_argument('--split', type=int, metavar='N', help='split data/ into N shard directories and exit')
+    args = parser.parse_args()
+
+    if args.split:
+        split_data('data', args.split)
+        return
+
+    processes = []
+    if args.spawn:
+        processes, urls = spawn_nodes(args.spawn, args.base_port, args.threads)
+        shard_urls[:] = urls
+
+    if not shard_urls:
+        parser.error('no shards configured: set TOODLESS_SHARDS or use --spawn')
+
+    print("🎉 Starting Toodless shard router")
+    for shard, url in enumerate(shard_urls):
+        print(f"  🧩 Shard {shard}: {url}")
+    print(f"🌐 Routing on http://localhost:{args.port}")
+    try:
+        router.run(host='0.0.0.0', port=args.port, threaded=True)
+    finally:
+        for process in processes:
+            process.terminate()
+
+
+if __name__ == '__main__':
+    main()
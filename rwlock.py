@@ -0,0 +1,65 @@
+"""
+Toodless Reader/Writer Lock
+Lets many request threads read the in-memory collections in parallel while
+writers get exclusive access
+"""
+
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    """Reader/writer lock that prefers waiting writers over new readers
+
+    Not reentrant: a thread holding the lock must not acquire it again.
+    """
+
+    def __init__(self):
+        self.condition = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.writer = False
+        self.waiting_writers = 0
+
+    def acquire_read(self):
+        with self.condition:
+            # New readers queue behind waiting writers so writes can't starve
+            while self.writer or self.waiting_writers:
+                self.condition.wait()
+            self.readers += 1
+
+    def release_read(self):
+        with self.condition:
+            self.readers -= 1
+            if not self.readers:
+                self.condition.notify_all()
+
+    def acquire_write(self):
+        with self.condition:
+            self.waiting_writers += 1
+            while self.writer or self.readers:
+                self.condition.wait()
+            self.waiting_writers -= 1
+            self.writer = True
+
+    def release_write(self):
+        with self.condition:
+            self.writer = False
+            self.condition.notify_all()
+
+    @contextmanager
+    def read(self):
+        """Hold the lock shared for the duration of a with block"""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self):
+        """Hold the lock exclusively for the duration of a with block"""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
@@ -0,0 +1,162 @@
+"""
+Toodless Server-Side Sessions
+Keeps session data on the server and only a random session id in the cookie.
+
+Two stores are available: an in-process memory store, and a SQLite store
+that survives restarts and is shared by every worker process using the same
+database file. Sessions expire after a TTL and expired ones are swept
+periodically.
+"""
+
+import json
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session whose data lives in a session store"""
+
+    def __init__(self, initial=None, sid=None, new=False, expires=0.0):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.expires = expires
+        self.modified = False
+        self.rotate_requested = False
+
+    def rotate(self):
+        """Issue a new session id on save (call on login to prevent session fixation)"""
+        self.rotate_requested = True
+
+
+class MemorySessionStore:
+    """Session store held in this process's memory"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions = {}
+
+    def get(self, sid):
+        with self.lock:
+            entry = self.sessions.get(sid)
+        if entry is None or entry[1] < time.time():
+            return None
+        return entry
+
+    def set(self, sid, data, expires):
+        with self.lock:
+            self.sessions[sid] = (data, expires)
+
+    def delete(self, sid):
+        with self.lock:
+            self.sessions.pop(sid, None)
+
+    def sweep(self):
+        now = time.time()
+        with self.lock:
+            expired = [sid for sid, (_, expires) in self.sessions.items() if expires < now]
+            for sid in expired:
+                del self.sessions[sid]
+        return len(expired)
+
+
+class SQLiteSessionStore:
+    """Session store in a SQLite database shared by all worker processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self.local = threading.local()
+        self.connection().execute(
+            'CREATE TABLE IF NOT EXISTS sessions (sid TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL)'
+        )
+        self.connection().execute('CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)')
+
+    def connection(self):
+        """Return this thread's connection, opening it on first use"""
+        connection = getattr(self.local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.local.connection = connection
+        return connection
+
+    def get(self, sid):
+        row = self.connection().execute(
+            'SELECT data, expires FROM sessions WHERE sid = ? AND expires >= ?', (sid, time.time())
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, sid, data, expires):
+        self.connection().execute(
+            'INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)',
+            (sid, json.dumps(data), expires)
+        )
+
+    def delete(self, sid):
+        self.connection().execute('DELETE FROM sessions WHERE sid = ?', (sid,))
+
+    def sweep(self):
+        return self.connection().execute('DELETE FROM sessions WHERE expires < ?', (time.time(),)).rowcount
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Flask session interface backed by a MemorySessionStore or SQLiteSessionStore"""
+
+    def __init__(self, store, ttl, sweep_interval=300):
+        self.store = store
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self.last_sweep = 0.0
+
+    def open_session(self, app, request):
+        now = time.time()
+        if now - self.last_sweep >= self.sweep_interval:
+            self.last_sweep = now
+            self.store.sweep()
+
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            entry = self.store.get(sid)
+            if entry is not None:
+                data, expires = entry
+                return ServerSideSession(data, sid=sid, expires=expires)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            # Emptied (e.g. logout) or never used: drop it and the cookie
+            if not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.rotate_requested and not session.new:
+            self.store.delete(session.sid)
+            session.sid = secrets.token_urlsafe(32)
+            session.new = True
+
+        now = time.time()
+        # Sliding expiry, refreshed at most once per tenth of the TTL to avoid a write per request
+        refresh = session.expires - now < self.ttl * 0.9
+        if session.new or session.modified or refresh:
+            session.expires = now + self.ttl
+            self.store.set(session.sid, dict(session), session.expires)
+            response.set_cookie(
+                name, session.sid, max_age=self.ttl, domain=domain, path=path,
+                secure=self.get_cookie_secure(app), httponly=self.get_cookie_httponly(app),
+                samesite=self.get_cookie_samesite(app)
+            )
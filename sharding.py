@@ -0,0 +1,23 @@
+"""
+Toodless Sharding
+Stable assignment of users to shards, shared by the app nodes and the router
+"""
+
+import hashlib
+import uuid
+
+# Namespace for deriving user ids from email addresses
+USER_ID_NAMESPACE = uuid.UUID('6f1c1d3e-52a4-4c55-9d0b-5b8f2a1e7c90')
+
+
+def user_id_for_email(email):
+    """Derive a user's id from their email, so the router can place a user before login"""
+    return str(uuid.uuid5(USER_ID_NAMESPACE, email.lower().strip()))
+
+
+def shard_for_user(user_id, shard_count):
+    """Map a user id to a shard index with a stable hash"""
+    if shard_count <= 1:
+        return 0
+    digest = hashlib.sha1(user_id.encode()).digest()
+    return int.from_bytes(digest[:8], 'big') % shard_count
@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Toodless Snapshots
+Online backups of all collections, as full or incremental snapshots, with
+restore to a point in time.
+
+A full snapshot holds every record. An incremental snapshot holds only the
+records changed or deleted since the previous snapshot, identified by their
+change sequence number. Each snapshot is a gzipped JSON file with a small
+.meta.json sidecar so listing doesn't need to decompress anything.
+
+CLI (talks to a running server's admin API, or works on the data directory
+directly with --offline):
+    python snapshots.py create [--incremental]
+    python snapshots.py list
+    python snapshots.py restore --id <snapshot_id>
+    python snapshots.py restore --at 2025-01-20T18:00:00
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+
+def write_snapshot(directory, snapshot):
+    """Write a snapshot and its metadata sidecar, returning the metadata"""
+    os.makedirs(directory, exist_ok=True)
+    meta = {key: snapshot[key] for key in ('id', 'type', 'base', 'created_at', 'seq', 'epoch')}
+    meta['records'] = sum(len(records) for records in snapshot.get('collections', snapshot.get('upserts', {})).values())
+    meta['deletes'] = sum(len(ids) for ids in snapshot.get('deletes', {}).values())
+
+    path = os.path.join(directory, f"{snapshot['id']}.json.gz")
+    with gzip.open(f"{path}.tmp", 'wt', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+    os.replace(f"{path}.tmp", path)
+    with open(os.path.join(directory, f"{snapshot['id']}.meta.json"), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def list_snapshots(directory):
+    """Return the metadata of all snapshots, oldest first"""
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in os.listdir(directory):
+        if name.endswith('.meta.json'):
+            with open(os.path.join(directory, name)) as f:
+                snapshots.append(json.load(f))
+    return sorted(snapshots, key=lambda meta: (meta['created_at'], meta['seq']))
+
+
+def read_snapshot(directory, snapshot_id):
+    """Load a snapshot file"""
+    with gzip.open(os.path.join(directory, f"{snapshot_id}.json.gz"), 'rt', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 timestamp into a naive local datetime, like snapshot created_at
+
+    Raises ValueError for anything that isn't an ISO 8601 date or timestamp.
+    """
+    try:
+        timestamp = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (AttributeError, TypeError, ValueError):
+        raise ValueError(f'Invalid timestamp: {value!r} (expected ISO 8601, e.g. 2025-01-20T18:00:00)')
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
+
+def find_snapshot(directory, snapshot_id=None, at=None):
+    """Find a snapshot by id, or the latest one taken at or before a timestamp
+
+    Raises ValueError if the timestamp can't be parsed.
+    """
+    at = parse_timestamp(at) if at is not None else None
+    snapshots = list_snapshots(directory)
+    if snapshot_id:
+        return next((meta for meta in snapshots if meta['id'] == snapshot_id), None)
+    candidates = [meta for meta in snapshots if at is None or datetime.fromisoformat(meta['created_at']) <= at]
+    return candidates[-1] if candidates else None
+
+
+def materialize(directory, snapshot_id):
+    """Rebuild every collection as of a snapshot by replaying its chain from the last full snapshot"""
+    chain = []
+    current = snapshot_id
+    while current:
+        snapshot = read_snapshot(directory, current)
+        chain.append(snapshot)
+        current = snapshot['base'] if snapshot['type'] == 'incremental' else None
+    chain.reverse()
+
+    collections = {}
+    for snapshot in chain:
+        if snapshot['type'] == 'full':
+            collections = {name: {r['id']: r for r in records} for name, records in snapshot['collections'].items()}
+            continue
+        for name, records in snapshot['upserts'].items():
+            by_id = collections.setdefault(name, {})
+            for record in records:
+                by_id[record['id']] = record
+        for name, ids in snapshot['deletes'].items():
+            by_id = collections.setdefault(name, {})
+            for record_id in ids:
+                by_id.pop(record_id, None)
+
+    return {name: list(by_id.values()) for name, by_id in collections.items()}
+
+
+# CLI
+
+def call_admin_api(url, token, method, path, body=None):
+    """Call the server's admin API and return the decoded JSON response"""
+    data = json.dumps(body).encode() if body is not None else None
+    request = urllib.request.Request(url.rstrip('/') + path, data=data, method=method,
+                                     headers={'Content-Type': 'application/json', 'X-Admin-Token': token or ''})
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            return json.load(response)
+    except urllib.error.HTTPError as e:
+        return json.load(e)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Toodless snapshots')
+    parser.add_argument('--url', default='http://localhost:5000', help='server to talk to')
+    parser.add_argument('--token', default=os.environ.get('TOODLESS_ADMIN_TOKEN'),
+                        help='admin token (default: $TOODLESS_ADMIN_TOKEN)')
+    parser.add_argument('--offline', action='store_true',
+                        help='work on the data directory directly (server must be stopped)')
+    commands = parser.add_subparsers(dest='command', required=True)
+    create = commands.add_parser('create', help='take a snapshot')
+    create.add_argument('--incremental', action='store_true', help='only store changes since the last snapshot')
+    commands.add_parser('list', help='list snapshots')
+    restore = commands.add_parser('restore', help='restore a snapshot')
+    target = restore.add_mutually_exclusive_group(required=True)
+    target.add_argument('--id', help='snapshot id to restore')
+    target.add_argument('--at', help='restore the latest snapshot taken at or before this ISO timestamp')
+    args = parser.parse_args()
+
+    if args.offline:
+        sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+        import app as toodless
+        if args.command == 'create':
+            result = {'success': True, 'snapshot': toodless.create_snapshot(args.incremental)}
+        elif args.command == 'list':
+            result = {'success': True, 'snapshots': list_snapshots(toodless.SNAPSHOT_DIR)}
+        else:
+            try:
+                restored = toodless.restore_snapshot(snapshot_id=args.id, at=args.at)
+                result = {'success': restored is not None, 'snapshot': restored}
+            except ValueError as e:
+                result = {'success': False, 'error': str(e)}
+    elif args.command == 'create':
+        result = call_admin_api(args.url, args.token, 'POST', '/api/admin/snapshots',
+                                {'incremental': args.incremental})
+    elif args.command == 'list':
+        result = call_admin_api(args.url, args.token, 'GET', '/api/admin/snapshots')
+    else:
+        result = call_admin_api(args.url, args.token, 'POST', '/api/admin/snapshots/restore',
+                                {'snapshot_id': args.id, 'at': args.at})
+
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result.get('success') else 1)
+
+
+if __name__ == '__main__':
+    main()